@@ -0,0 +1,16 @@
+#version 330
+// Пиксель предмета из атласа (типы в один ряд по ID)
+
+uniform sampler2D atlas;
+uniform float item_px;
+
+in vec2 v_uv;
+flat in int v_kind;
+out vec4 f_color;
+
+void main() {
+    int px = int(item_px);
+    ivec2 pixel = min(ivec2(v_uv * item_px), ivec2(px - 1));
+    f_color = texelFetch(atlas, ivec2(v_kind * px + pixel.x, pixel.y), 0);
+    if (f_color.a == 0.0) discard;
+}
@@ -0,0 +1,22 @@
+#version 330
+// Инстансный квад выпавшего предмета: центр и тип берутся из буфера экземпляров
+
+uniform WindowBlock {
+    mat4 projection;
+    mat4 view;
+} window;
+
+uniform float item_px;
+
+in vec2 in_pos;
+in vec2 in_center;
+in float in_kind;
+
+out vec2 v_uv;
+flat out int v_kind;
+
+void main() {
+    v_uv = in_pos;
+    v_kind = int(in_kind + 0.5);
+    gl_Position = window.projection * window.view * vec4(in_center + (in_pos - 0.5) * item_px, 0.0, 1.0);
+}
@@ -0,0 +1,9 @@
+#version 330
+// Частица - сплошной цвет
+
+in vec4 v_color;
+out vec4 f_color;
+
+void main() {
+    f_color = v_color;
+}
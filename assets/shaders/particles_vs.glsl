@@ -0,0 +1,20 @@
+#version 330
+// Инстансный квадрат частицы: центр и цвет берутся из буфера экземпляров
+
+uniform WindowBlock {
+    mat4 projection;
+    mat4 view;
+} window;
+
+uniform float particle_px;
+
+in vec2 in_pos;
+in vec2 in_center;
+in vec4 in_color;
+
+out vec4 v_color;
+
+void main() {
+    v_color = in_color;
+    gl_Position = window.projection * window.view * vec4(in_center + (in_pos - 0.5) * particle_px, 0.0, 1.0);
+}
@@ -0,0 +1,21 @@
+#version 330
+// Клетки чанка: ID блока из целочисленной текстуры, пиксели - из атласа блоков (блоки в ряд по ID)
+
+uniform usampler2D tiles;
+uniform sampler2D atlas;
+uniform int chunk_size;
+uniform int tile_px;
+
+in vec2 v_uv;
+out vec4 f_color;
+
+void main() {
+    vec2 cell = v_uv * float(chunk_size);
+    ivec2 cell_pos = min(ivec2(cell), ivec2(chunk_size - 1));
+    int block_id = int(texelFetch(tiles, cell_pos, 0).r);
+    if (block_id == 0) discard;
+
+    ivec2 pixel = min(ivec2(fract(cell) * float(tile_px)), ivec2(tile_px - 1));
+    f_color = texelFetch(atlas, ivec2(block_id * tile_px + pixel.x, pixel.y), 0);
+    if (f_color.a == 0.0) discard;
+}
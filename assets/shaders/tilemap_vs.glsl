@@ -0,0 +1,18 @@
+#version 330
+// Квад одного чанка: вершины (0..1) растягиваются на чанк в мировых координатах
+
+uniform WindowBlock {
+    mat4 projection;
+    mat4 view;
+} window;
+
+uniform vec2 origin;
+uniform float chunk_px;
+
+in vec2 in_pos;
+out vec2 v_uv;
+
+void main() {
+    v_uv = in_pos;
+    gl_Position = window.projection * window.view * vec4(origin + in_pos * chunk_px, 0.0, 1.0);
+}
@@ -0,0 +1,200 @@
+"""Сценарные замеры игровой логики без окна (GameSimulation): время кадров, подгрузка чанков, сохранение.
+
+Каждый сценарий идет в своей временной папке сохранений с одинаковым сидом случайных чисел,
+кадр - один шаг симуляции SIM_DT. save_ms - пауза игры на снимок сохранения, save_write_ms - время
+до конца фоновой записи. Результат - JSON, его удобно сравнивать между коммитами.
+
+Запуск из корня проекта: python -m benchmarks.scenarios [сценарий ...] [--seconds N] [--out файл.json]
+"""
+import argparse
+import json
+import random
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from core.constants import *
+from core.sim import GameSimulation
+
+SCENARIOS = {}
+
+
+def scenario(name):
+    def register(func):
+        SCENARIOS[name] = func
+        return func
+    return register
+
+
+def percentiles_ms(samples):
+    if not samples: return {"count": 0}
+    ms = np.asarray(samples) * 1000
+    return {"count": len(ms), "p50": round(float(np.percentile(ms, 50)), 3),
+            "p95": round(float(np.percentile(ms, 95)), 3), "p99": round(float(np.percentile(ms, 99)), 3),
+            "max": round(float(ms.max()), 3)}
+
+
+def give(sim, item_type, count=1):
+    """Кладет предмет в инвентарь и выбирает его ячейку"""
+    sim.player.inventory[item_type] = sim.player.inventory.get(item_type, 0) + count
+    sim.update_hotbar()
+    sim.selected_slot_index = sim.slot_contents.index(item_type)
+
+
+def tile_center(wx, wy):
+    return wx * SPRITE_PIXEL_SIZE + SPRITE_PIXEL_SIZE / 2, wy * SPRITE_PIXEL_SIZE + SPRITE_PIXEL_SIZE / 2
+
+
+def player_tile(sim):
+    return int(sim.player.center_x // SPRITE_PIXEL_SIZE), int(sim.player.center_y // SPRITE_PIXEL_SIZE)
+
+
+@scenario("walk")
+def walk(sim, frame):
+    """Долгий путь вправо через чанки: упершись, игрок прыгает и сверлит блок перед собой"""
+    give(sim, "quantum_drill")
+    sim.player.right_pressed = True
+    last_x = sim.player.center_x
+    while frame():
+        if abs(sim.player.center_x - last_x) < 1:
+            wx, wy = player_tile(sim)
+            sim.use_selected_at(*tile_center(wx + 1, wy))
+            sim.jump()
+        last_x = sim.player.center_x
+
+
+@scenario("dive")
+def dive(sim, frame):
+    """Спуск на Уровень 2 в стороне от базы: сверлим блок под игроком, пока не окажемся ниже слоя ядра"""
+    give(sim, "quantum_drill")
+    sim.player.center_x = tile_center(12, 0)[0]
+    while frame():
+        if sim.player.center_y < (LEVEL_2_START_Y - 4) * SPRITE_PIXEL_SIZE: break
+        wx, wy = player_tile(sim)
+        sim.use_selected_at(*tile_center(wx, wy - 1))
+
+
+@scenario("drill")
+def drill(sim, frame):
+    """Квантовый бур по случайным клеткам под зависшим над поверхностью игроком: разрушение,
+    выпадение предметов, частицы"""
+    give(sim, "quantum_drill")
+    anchor = tile_center(12, 7)
+    rng = random.Random(1)
+    while frame():
+        sim.player.position = anchor
+        sim.player.change_y = 0
+        sim.use_selected_at(*tile_center(12 + rng.randint(-3, 3), 7 - rng.randint(1, 4)))
+
+
+@scenario("chest")
+def chest(sim, frame):
+    """Полный сундук выбрасывается рядом с игроком каждую секунду, игрок подбирает все обратно"""
+    wx, wy = player_tile(sim)
+    sim.world.add_block(wx + 1, wy, BLOCK_CHEST)
+    _, block = sim.world.block_at(wx + 1, wy)
+    machine = sim.world.block_machine(block)
+    kinds = list(sim.player.inventory)[:10]
+    step = 0
+    while frame():
+        if step % SIM_RATE == 0:
+            machine.inventory = {kind: 999 for kind in kinds}
+            sim.eject_items(block)
+        step += 1
+
+
+@scenario("base")
+def base(sim, frame):
+    """База из сотен механизмов над поверхностью; в случайные прессы летит лом"""
+    wx0, wy0 = player_tile(sim)
+    machines = []
+    for i in range(400):
+        wx, wy = wx0 - 20 + i % 40, wy0 + 2 + i // 40
+        block_type = (BLOCK_PRESS, BLOCK_FURNACE, BLOCK_CHEST, BLOCK_ASSEMBLER)[i % 4]
+        sim.world.add_block(wx, wy, block_type)
+        if block_type == BLOCK_PRESS: machines.append((wx, wy))
+    rng = random.Random(1)
+    while frame():
+        wx, wy = rng.choice(machines)
+        x, y = tile_center(wx, wy)
+        sim.dropped_items.spawn("scrap", x - SPRITE_PIXEL_SIZE, y, 6, 0, thrown=True, count=2)
+
+
+def run_scenario(name, seconds):
+    random.seed(0)
+    np.random.seed(0)
+    with tempfile.TemporaryDirectory() as save_dir:
+        sim = GameSimulation(save_dir)
+        sim.reset()
+        frames = []
+        deaths = 0
+        limit = int(seconds * SIM_RATE)
+
+        def frame():
+            """Один кадр симуляции с замером; False - время сценария вышло.
+            Погибший игрок оживает на месте, чтобы сценарий шел дальше по своему пути"""
+            nonlocal deaths
+            if len(frames) >= limit: return False
+            if sim.is_dead:
+                deaths += 1
+                sim.is_dead = False
+                sim.player.hp = sim.player.max_hp
+            start = time.perf_counter()
+            sim.advance(SIM_DT)
+            frames.append(time.perf_counter() - start)
+            return True
+
+        SCENARIOS[name](sim, frame)
+
+        world = sim.world
+        dirty = sum(chunk.dirty for chunk in world.active_chunks.values())
+        start = time.perf_counter()
+        sim.save_game()
+        save_time = time.perf_counter() - start
+        world.writer.wait()
+        write_time = time.perf_counter() - start
+        result = {
+            "frames": len(frames),
+            "frame_ms": percentiles_ms(frames),
+            "chunk_load_ms": percentiles_ms(list(world.load_latencies)),
+            "subsystem_ms": {name: round(total / max(len(frames), 1) * 1000, 4)
+                             for name, total in sorted(sim.timings.current.items())},
+            "save_ms": round(save_time * 1000, 3),
+            "save_write_ms": round(write_time * 1000, 3),
+            "chunks_saved": dirty,
+            "inventory_writes": {"changes": sim.inventory_store.changes, "writes": sim.inventory_store.writes},
+            "journal_edits": world.journal.appended,
+            "sprites": {"active": sum(len(c.sprites) for c in world.active_chunks.values()),
+                        "cached": sum(len(c.sprites) for c in world.chunk_cache.values())},
+            "chunks": {"active": len(world.active_chunks), **world.chunk_stats},
+            "dropped_items": len(sim.dropped_items),
+            "particles": len(sim.particles),
+            "player": [round(sim.player.center_x), round(sim.player.center_y)],
+            "deaths": deaths,
+        }
+        world.close()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Сценарные замеры игровой логики без окна")
+    parser.add_argument("scenarios", nargs="*", help=f"из {', '.join(SCENARIOS)}; по умолчанию - все")
+    parser.add_argument("--seconds", type=float, default=20.0, help="секунд игры на сценарий")
+    parser.add_argument("--out", help="куда записать JSON (по умолчанию - stdout)")
+    args = parser.parse_args()
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown: parser.error(f"неизвестные сценарии: {', '.join(sorted(unknown))}")
+
+    report = {"sim_rate": SIM_RATE, "seconds": args.seconds,
+              "scenarios": {name: run_scenario(name, args.seconds) for name in args.scenarios or SCENARIOS}}
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.out:
+        with open(args.out, "w") as f: f.write(text)
+    else:
+        sys.stdout.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
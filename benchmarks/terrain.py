@@ -0,0 +1,96 @@
+"""Сравнение скорости генерации чанков: старый поклеточный путь против векторного NumPy.
+
+Запуск из корня проекта: python -m benchmarks.terrain [кол-во чанков]
+"""
+import math
+import random
+import sys
+import time
+from collections import Counter
+
+from core.constants import *
+from core.terrain import generate_chunk
+
+
+def legacy_default_block(wx, wy):
+    """Прежний World.get_default_block: пересев random строкой и шум на чистом Python"""
+    if -7 <= wx <= 7 and 1 <= wy <= 9:
+        if 1 <= wy <= 2 and -5 <= wx <= 5: return BLOCK_CORE
+        if wx == 0 and wy == 3: return BLOCK_EXTRACTOR
+        if wx == -2 and wy == 3: return BLOCK_TELEPORTER
+        if wx == 2 and wy == 3: return BLOCK_PRESS
+        if wx == 4 and wy == 3: return BLOCK_ASSEMBLER
+        return BLOCK_EMPTY
+
+    if LEVEL_2_START_Y <= wy <= LEVEL_2_START_Y + 2: return BLOCK_CORE
+
+    random.seed(f"seed_{wx}_{wy}")
+    noise = math.sin(wx * 0.2) * math.cos(wy * 0.2) + math.sin(wx * 0.05 + wy * 0.05)
+
+    if wy < LEVEL_2_START_Y:
+        if noise > 0.4: return BLOCK_EMPTY
+        rand = random.random()
+        if noise > 0.35 and rand < 0.5: return BLOCK_ACID
+        for threshold, block in ((0.01, BLOCK_TERMINAL), (0.02, BLOCK_MONOLITH), (0.04, BLOCK_URANIUM_ORE),
+                                 (0.06, BLOCK_SHROOM), (0.10, BLOCK_BIOMASS), (0.14, BLOCK_GEYSER),
+                                 (0.18, BLOCK_SPIKES), (0.25, BLOCK_TITANIUM_ORE)):
+            if rand < threshold: return block
+        return BLOCK_DEEP_SLATE
+
+    if wy > 5: return BLOCK_EMPTY
+    if wy == 5: return BLOCK_DUST
+    if noise > 0.4: return BLOCK_EMPTY
+
+    rand = random.random()
+    for threshold, block in ((0.05, BLOCK_FRAGILE), (0.08, BLOCK_BOUNCY), (0.12, BLOCK_HAZARD),
+                             (0.17, BLOCK_COPPER_ORE), (0.25, BLOCK_METAL), (0.40, BLOCK_DUST)):
+        if rand < threshold: return block
+    return BLOCK_QUANTUM
+
+
+def legacy_generate_chunk(cx, cy):
+    return [[legacy_default_block(cx * CHUNK_SIZE + lx, cy * CHUNK_SIZE + ly) for ly in range(CHUNK_SIZE)]
+            for lx in range(CHUNK_SIZE)]
+
+
+def sample_chunks(count):
+    """Чанки вдоль поверхности, у слоя ядра и в Глубинах"""
+    rows = (0, -1, -3, -4, -5, -8)
+    return [(i - count // (2 * len(rows)), rows[i % len(rows)]) for i in range(count)]
+
+
+def bench(generate, chunks):
+    start = time.perf_counter()
+    grids = [generate(cx, cy) for cx, cy in chunks]
+    return len(chunks) / (time.perf_counter() - start), grids
+
+
+def distribution(grids):
+    counts = Counter()
+    for grid in grids:
+        for row in grid:
+            counts.update(int(b) for b in row)
+    total = sum(counts.values())
+    return {block: counts[block] / total for block in sorted(counts)}
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    chunks = sample_chunks(count)
+
+    legacy_rate, legacy_grids = bench(legacy_generate_chunk, chunks)
+    numpy_rate, numpy_grids = bench(generate_chunk, chunks)
+
+    print(f"Чанков: {count}")
+    print(f"  поклеточно (random.seed строкой): {legacy_rate:10.1f} чанков/с")
+    print(f"  NumPy (счетный ГСЧ):              {numpy_rate:10.1f} чанков/с")
+    print(f"  ускорение: x{numpy_rate / legacy_rate:.1f}")
+
+    legacy_dist, numpy_dist = distribution(legacy_grids), distribution(numpy_grids)
+    print("Доля блоков (старый / новый):")
+    for block in sorted(set(legacy_dist) | set(numpy_dist)):
+        print(f"  {block:3d}: {legacy_dist.get(block, 0):.4f} / {numpy_dist.get(block, 0):.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+import numpy as np
+
+from .constants import *
+from .ticks import TICK_DISSOLVE
+
+DISSOLVABLE_BLOCKS = np.array([BLOCK_METAL, BLOCK_METAL2], dtype=np.uint8)
+
+
+def acid_contact_mask(grid, wy):
+    """Клеточный автомат растворения, один шаг соседства.
+
+    grid - окно ID блоков [x, y] с рамкой в одну клетку, wy - мировые y внутренних клеток.
+    Маска внутренних клеток: растворимый металл в Глубинах, у которого сбоку/сверху/снизу кислота.
+    """
+    acid = grid == BLOCK_ACID
+    near_acid = acid[:-2, 1:-1] | acid[2:, 1:-1] | acid[1:-1, :-2] | acid[1:-1, 2:]
+    return np.isin(grid[1:-1, 1:-1], DISSOLVABLE_BLOCKS) & near_acid & (wy < LEVEL_2_START_Y)
+
+
+class AcidContacts:
+    """Клетки металла, касающиеся кислоты, и сроки их растворения.
+
+    Набор пересчитывается только вокруг измененных клеток (установка/поломка блока, загрузка и
+    выгрузка чанка). Для новой клетки в очередь тиков мира ставится событие растворения; если
+    клетка перестала касаться кислоты, событие просто окажется устаревшим.
+    """
+
+    def __init__(self, world):
+        self.world = world
+        self.deadlines = {}  # (wx, wy) -> время растворения по часам очереди тиков
+
+    def __len__(self):
+        return len(self.deadlines)
+
+    def refresh(self, wx0, wy0, wx1, wy1):
+        """Пересчитывает членство клеток прямоугольника [wx0..wx1] x [wy0..wy1]"""
+        grid = self.world.grid_window(wx0 - 1, wy0 - 1, wx1 + 1, wy1 + 1)
+        mask = acid_contact_mask(grid, np.arange(wy0, wy1 + 1)[None, :])
+        touching = {(int(x) + wx0, int(y) + wy0) for x, y in zip(*np.nonzero(mask))}
+
+        for cell in [c for c in self.deadlines if wx0 <= c[0] <= wx1 and wy0 <= c[1] <= wy1]:
+            if cell not in touching: del self.deadlines[cell]
+        for cell in touching:
+            if cell not in self.deadlines:
+                deadline = self.world.ticks.now + ACID_DISSOLVE_TIME
+                self.deadlines[cell] = deadline
+                self.world.ticks.schedule(ACID_DISSOLVE_TIME, TICK_DISSOLVE, cell, deadline)
+
+    def refresh_around(self, wx, wy):
+        self.refresh(wx - 1, wy - 1, wx + 1, wy + 1)
+
+    def take_due(self, cell, deadline):
+        """True, если событие растворения клетки актуально (клетка все еще касается кислоты с тех пор)"""
+        if self.deadlines.get(cell) != deadline: return False
+        del self.deadlines[cell]
+        return True
@@ -2,6 +2,7 @@
 SCREEN_WIDTH = 1280
 SCREEN_HEIGHT = 720
 SCREEN_TITLE = "Quantum Rift: Infinite"
+RENDER_RATE = 60  # Частота отрисовки (кадров в секунду); симуляция идет с SIM_RATE независимо от нее
 
 VIRTUAL_WIDTH = 1280
 VIRTUAL_HEIGHT = 720
@@ -9,8 +10,21 @@ VIRTUAL_HEIGHT = 720
 # --- НАСТРОЙКИ МИРА ---
 SPRITE_PIXEL_SIZE = 64
 CHUNK_SIZE = 16
+WORLD_SEED = 1337
+REGION_SIZE = 32  # Чанков по стороне в одном файле региона
+CHUNK_LOAD_WORKERS = 2  # Фоновые потоки загрузки/генерации чанков
+CHUNK_PREFETCH_FRAMES = 30  # На сколько кадров вперед по скорости игрока подгружать чанки
+CHUNK_ATTACH_PER_FRAME = 2  # Сколько готовых чанков добавлять в мир за кадр
+CHUNK_LOAD_RADIUS = 1  # Чанки в этом радиусе вокруг игрока загружаются
+CHUNK_UNLOAD_RADIUS = 2  # ...а выгружаются только дальше этого радиуса (гистерезис)
+CHUNK_CACHE_SIZE = 64  # Сколько выгруженных чанков держать в памяти (LRU)
+CHUNK_CACHE_SPRITE_LIMIT = 16384  # Сколько спрайтов выгруженных чанков можно держать, остальные пересоздаются
+AUTOSAVE_INTERVAL = 30  # Секунд игры между автосохранениями
 
 # --- ФИЗИКА ---
+SIM_RATE = 60  # Шагов симуляции в секунду; все "за кадр" константы физики заданы на один шаг
+SIM_DT = 1 / SIM_RATE
+SIM_MAX_STEPS = 5  # Больше шагов за кадр не делаем, отставание отбрасывается
 GRAVITY = 0.5
 PLAYER_MOVEMENT_SPEED = 7
 PLAYER_JUMP_SPEED = 12
@@ -25,6 +39,12 @@ MANA_REGEN_FROM_ITEM = 100
 SHARD_DROP_CHANCE = 0.5
 COPPER_DROP_CHANCE = 0.5
 COPPER_SCRAP_DROP_CHANCE = 0.7
+GEYSER_PERIOD = 3.0  # Секунд между выбросами гейзера
+ITEM_HALF_SIZE = 24  # Полуразмер квадрата столкновений выпавшего предмета
+MAX_DROPPED_ITEMS = 512  # Жесткий бюджет стопок выпавших предметов: сверх него одинаковые сливаются
+PARTICLE_BUDGET = 2048  # Максимум одновременно живых частиц
+PARTICLE_QUALITY = 3  # Качество частиц: 0 - выкл, 3 - все
+ACID_DISSOLVE_TIME = 5.0  # Секунд до растворения металла, касающегося кислоты (в Глубинах)
 
 # --- НАСТРОЙКИ UI ---
 UI_SLOT_SIZE = 64
@@ -85,6 +105,7 @@ COLOR_COPPER_ORE = (180, 100, 50)
 COLOR_FURNACE = (50, 50, 50)
 COLOR_ASSEMBLER = (100, 200, 100)
 COLOR_CHEST = (139, 69, 19)
+COLOR_CHUNK_PLACEHOLDER = (25, 25, 35)
 
 # Заглушки Уровня 2
 COLOR_DEEP_SLATE = (15, 15, 20)
@@ -1,18 +1,224 @@
-import arcade
 import random
+from array import array
 
+import numpy as np
+from PIL import Image
+from arcade.gl import BufferDescription
 
-class DroppedItem(arcade.Sprite):
-    """Класс для выброшенных ресурсов"""
+from .constants import *
 
-    def __init__(self, texture, item_type, x, y):
-        super().__init__(texture)
-        self.item_type = item_type
-        self.center_x = x
-        self.center_y = y
+ITEM_VERTEX_SHADER = "assets/shaders/items_vs.glsl"
+ITEM_FRAGMENT_SHADER = "assets/shaders/items_fs.glsl"
 
-        self.change_y = random.uniform(2, 5)
-        self.change_x = random.uniform(-2, 2)
+ITEM_MAGNET_RADIUS = 150
+ITEM_PICKUP_RADIUS = 40
+ITEM_PICKUP_DELAY = 0.5  # Секунд после появления, прежде чем предмет можно подобрать
+ITEM_MERGE_RADIUS = 32  # Одинаковые предметы в одной клетке такого размера сливаются в стопку
 
-        self.is_thrown = False
-        self.timer = 0.0
\ No newline at end of file
+
+def box_hits(grid, wx0, wy0, lut, x, y, half):
+    """Маска предметов, чей квадрат со стороной 2*half касается клетки с lut[ID] == True.
+    grid - сетка ID блоков [x, y] с началом в клетке (wx0, wy0), за ее пределами пусто."""
+    hits = np.zeros(len(x), dtype=bool)
+    for px, py in ((x - half, y - half), (x + half, y - half), (x - half, y + half), (x + half, y + half)):
+        cx = np.floor(px / SPRITE_PIXEL_SIZE).astype(np.int64) - wx0
+        cy = np.floor(py / SPRITE_PIXEL_SIZE).astype(np.int64) - wy0
+        inside = (cx >= 0) & (cx < grid.shape[0]) & (cy >= 0) & (cy < grid.shape[1])
+        hits[inside] |= lut[grid[cx[inside], cy[inside]]]
+    return hits
+
+
+class DroppedItems:
+    """Выпавшие предметы как структура массивов NumPy: позиция, скорость, тип, размер стопки, таймер,
+    брошен ли.
+
+    Живые предметы занимают первые count элементов массивов. Интегрирование, столкновения с сеткой
+    блоков и притяжение к игроку считаются векторно для всех предметов сразу. Каждый элемент -
+    стопка одинаковых предметов; стопок не больше MAX_DROPPED_ITEMS, сверх бюджета новые стопки
+    сливаются с лежащими того же типа или не принимаются.
+    """
+
+    def __init__(self, capacity=256):
+        self.type_names = []
+        self.type_ids = {}
+        self.count = 0
+        self._allocate(capacity)
+
+    def _allocate(self, capacity):
+        old = self.count
+        arrays = {
+            "x": np.zeros(capacity), "y": np.zeros(capacity), "vx": np.zeros(capacity), "vy": np.zeros(capacity),
+            "prev_x": np.zeros(capacity), "prev_y": np.zeros(capacity),
+            "timer": np.zeros(capacity), "kind": np.zeros(capacity, dtype=np.int32),
+            "stack": np.zeros(capacity, dtype=np.int64),
+            "thrown": np.zeros(capacity, dtype=bool),
+        }
+        for name, arr in arrays.items():
+            if old: arr[:old] = getattr(self, name)[:old]
+            setattr(self, name, arr)
+
+    def __len__(self):
+        return self.count
+
+    def type_id(self, item_type):
+        type_id = self.type_ids.get(item_type)
+        if type_id is None:
+            type_id = self.type_ids[item_type] = len(self.type_names)
+            self.type_names.append(item_type)
+        return type_id
+
+    def type_name(self, index):
+        return self.type_names[self.kind[index]]
+
+    def spawn(self, item_type, x, y, vx, vy, thrown=False, count=1):
+        """Добавляет стопку из count предметов; False - стопка не принята.
+        MAX_DROPPED_ITEMS - жесткий бюджет стопок: сверх него выпавшая стопка докладывается в ближайшую
+        лежащую стопку того же типа, а если такой нет (или стопка брошена в механизм) - не принимается.
+        Предметы не пропадают: непринятую стопку вызывающий оставляет у себя (GameSimulation.spawn_item)"""
+        type_id = self.type_id(item_type)
+        if self.count >= MAX_DROPPED_ITEMS:
+            if thrown: return False
+            n = self.count
+            same = np.flatnonzero((self.kind[:n] == type_id) & ~self.thrown[:n])
+            if not len(same): return False
+            nearest = same[np.argmin(np.hypot(self.x[same] - x, self.y[same] - y))]
+            self.stack[nearest] += count
+            return True
+
+        if self.count == len(self.x): self._allocate(len(self.x) * 2)
+        i = self.count
+        self.x[i], self.y[i], self.vx[i], self.vy[i] = x, y, vx, vy
+        self.prev_x[i], self.prev_y[i] = x, y
+        self.timer[i] = 0.0
+        self.kind[i] = type_id
+        self.stack[i] = count
+        self.thrown[i] = thrown
+        self.count += 1
+        return True
+
+    def remove(self, mask):
+        """Удаляет предметы по маске длины count, сохраняя порядок остальных"""
+        keep = ~mask
+        n = int(keep.sum())
+        for arr in (self.x, self.y, self.vx, self.vy, self.prev_x, self.prev_y, self.timer, self.kind, self.stack,
+                    self.thrown):
+            arr[:n] = arr[:self.count][keep]
+        self.count = n
+
+    def clear(self):
+        self.count = 0
+
+    def merge(self):
+        """Сливает лежащие рядом одинаковые (не брошенные) предметы в одну стопку"""
+        n = self.count
+        loose = np.flatnonzero(~self.thrown[:n])
+        if len(loose) < 2: return
+        qx = np.floor(self.x[loose] / ITEM_MERGE_RADIUS).astype(np.int64) + (1 << 20)
+        qy = np.floor(self.y[loose] / ITEM_MERGE_RADIUS).astype(np.int64) + (1 << 20)
+        keys = (self.kind[loose].astype(np.int64) << 42) | (qx << 21) | qy
+        _, first, groups = np.unique(keys, return_index=True, return_inverse=True)
+        if len(first) == len(loose): return
+
+        heads = loose[first]
+        self.stack[heads] = np.bincount(groups.reshape(-1), weights=self.stack[loose]).astype(np.int64)
+        merged = np.zeros(n, dtype=bool)
+        merged[loose] = True
+        merged[heads] = False
+        self.remove(merged)
+
+    def step(self, dt, grid, wx0, wy0, solid):
+        """Шаг физики: гравитация, затухание, движение по осям с откатом при упоре в твердый блок.
+        Предмет, уже застрявший в блоке (например, выпал внутрь стены), проходит сквозь него."""
+        n = self.count
+        x, y, vx, vy = self.x[:n], self.y[:n], self.vx[:n], self.vy[:n]
+        self.prev_x[:n], self.prev_y[:n] = x, y
+        self.timer[:n] += dt
+
+        stuck = box_hits(grid, wx0, wy0, solid, x, y, ITEM_HALF_SIZE)
+        new_x = x + vx
+        hit = box_hits(grid, wx0, wy0, solid, new_x, y, ITEM_HALF_SIZE) & ~stuck
+        x[~hit] = new_x[~hit]
+        vx[hit] = 0
+
+        new_y = y + vy
+        hit = box_hits(grid, wx0, wy0, solid, x, new_y, ITEM_HALF_SIZE) & ~stuck
+        y[~hit] = new_y[~hit]
+        vy[hit] = 0
+
+        vy -= GRAVITY * 0.5
+        vx *= 0.95
+
+    def attract(self, px, py):
+        """Притягивает лежащие предметы к точке (игроку); возвращает маску предметов в радиусе подбора"""
+        n = self.count
+        dx, dy = px - self.x[:n], py - self.y[:n]
+        dist = np.hypot(dx, dy)
+        vx, vy = self.vx[:n], self.vy[:n]
+        ready = self.timer[:n] > ITEM_PICKUP_DELAY
+        resting = ~self.thrown[:n] | ((np.abs(vx) < 0.5) & (np.abs(vy) < 0.5))
+        pull = ready & resting & (dist < ITEM_MAGNET_RADIUS)
+        scale = 1.5 / np.maximum(dist[pull], 1e-6)
+        vx[pull] += dx[pull] * scale
+        vy[pull] += dy[pull] * scale
+        return ready & (dist < ITEM_PICKUP_RADIUS)
+
+
+def random_drop_velocity():
+    return random.uniform(-2, 2), random.uniform(2, 5)
+
+
+class ItemRenderer:
+    """Рисует все выпавшие предметы одним инстансным вызовом из буфера (x, y, тип)"""
+
+    def __init__(self, ctx, textures, fallback_texture):
+        self.ctx = ctx
+        self.textures = textures
+        self.fallback_texture = fallback_texture
+        self.program = ctx.load_program(vertex_shader=ITEM_VERTEX_SHADER, fragment_shader=ITEM_FRAGMENT_SHADER)
+        self.program["atlas"] = 0
+        self.program["item_px"] = SPRITE_PIXEL_SIZE
+        self.quad = ctx.buffer(data=array("f", [0, 0, 1, 0, 0, 1, 1, 1]))
+        self.atlas = None
+        self.atlas_types = 0
+        self.instances = None
+        self.geometry = None
+        self.capacity = 0
+
+    def _build_atlas(self, type_names):
+        """Атлас предметов в один ряд по ID типа (ID назначает DroppedItems)"""
+        atlas = Image.new("RGBA", (SPRITE_PIXEL_SIZE * max(1, len(type_names)), SPRITE_PIXEL_SIZE), (0, 0, 0, 0))
+        for type_id, name in enumerate(type_names):
+            image = self.textures.get(name, self.fallback_texture).image.convert("RGBA")
+            if image.size != (SPRITE_PIXEL_SIZE, SPRITE_PIXEL_SIZE):
+                image = image.resize((SPRITE_PIXEL_SIZE, SPRITE_PIXEL_SIZE), Image.NEAREST)
+            atlas.paste(image, (type_id * SPRITE_PIXEL_SIZE, 0))
+        atlas = atlas.transpose(Image.FLIP_TOP_BOTTOM)
+        if self.atlas is not None: self.atlas.delete()
+        self.atlas = self.ctx.texture(atlas.size, components=4, data=atlas.tobytes(),
+                                      filter=(self.ctx.NEAREST, self.ctx.NEAREST))
+        self.atlas_types = len(type_names)
+
+    def _reserve(self, count):
+        self.capacity = max(256, self.capacity * 2, count)
+        self.instances = self.ctx.buffer(reserve=self.capacity * 12)
+        self.geometry = self.ctx.geometry([
+            BufferDescription(self.quad, "2f", ["in_pos"]),
+            BufferDescription(self.instances, "2f 1f", ["in_center", "in_kind"], instanced=True),
+        ], mode=self.ctx.TRIANGLE_STRIP)
+
+    def draw(self, items, alpha=1.0):
+        """alpha - доля шага симуляции между прошлой и текущей позицией (интерполяция отрисовки)"""
+        n = len(items)
+        if n == 0: return
+        if len(items.type_names) > self.atlas_types: self._build_atlas(items.type_names)
+        if n > self.capacity: self._reserve(n)
+
+        data = np.empty((n, 3), dtype=np.float32)
+        data[:, 0] = items.prev_x[:n] + (items.x[:n] - items.prev_x[:n]) * alpha
+        data[:, 1] = items.prev_y[:n] + (items.y[:n] - items.prev_y[:n]) * alpha
+        data[:, 2] = items.kind[:n]
+        self.instances.write(data.tobytes())
+
+        self.ctx.enable(self.ctx.BLEND)
+        self.atlas.use(0)
+        self.geometry.render(self.program, instances=n)
@@ -0,0 +1,160 @@
+import glob
+import json
+import os
+import re
+import struct
+import zlib
+
+from .constants import *
+from .region import cell_index
+from .terrain import generate_chunk
+
+JOURNAL_SYNC_INTERVAL = 0.5  # Секунд между fsync журнала: правки за это время сбрасываются на диск одним вызовом
+
+EDIT_BLOCK = 1  # Блок в клетке заменен, нагрузка - ID блока (мета клетки сбрасывается)
+EDIT_META = 2  # Состояние механизма в клетке, нагрузка - JSON Machine.to_meta()
+
+# Запись: тип правки, клетка мира (wx, wy), длина нагрузки; затем CRC32 этих полей с нагрузкой и сама нагрузка
+_RECORD_KEY = struct.Struct("<BiiI")
+_RECORD_CRC = struct.Struct("<I")
+
+_SEGMENT_RE = re.compile(r"journal_(\d+)\.bin$")
+
+
+def read_records(path):
+    """Записи сегмента по порядку: (тип, wx, wy, нагрузка).
+    Оборванная или испорченная запись (падение посреди записи) и все после нее отбрасываются."""
+    with open(path, "rb") as f:
+        data = f.read()
+    pos = 0
+    header = _RECORD_KEY.size + _RECORD_CRC.size
+    while pos + header <= len(data):
+        kind, wx, wy, length = _RECORD_KEY.unpack_from(data, pos)
+        (crc,) = _RECORD_CRC.unpack_from(data, pos + _RECORD_KEY.size)
+        payload = data[pos + header:pos + header + length]
+        if len(payload) < length or zlib.crc32(data[pos:pos + _RECORD_KEY.size] + payload) != crc: break
+        yield kind, wx, wy, payload
+        pos += header + length
+
+
+class EditJournal:
+    """Журнал правок мира только на дописывание: правка блока или механизма - одна короткая запись.
+
+    Записи идут в текущий сегмент saves/journal_N.bin и сразу отдаются ОС (переживают падение игры),
+    fsync делается пачкой раз в JOURNAL_SYNC_INTERVAL в потоке записи. При загрузке мира оставшиеся
+    сегменты проигрываются в файлы регионов и удаляются. rotate() после снимка измененных чанков
+    начинает новый сегмент, а старые удаляются, когда снимки записаны, - так журнал сжимается
+    в хранилище чанков. Сегменты удаляются только по порядку: пока хоть один снимок не записан,
+    остаются его сегмент и все следующие, иначе при проигрывании старая правка перекрыла бы новую.
+    """
+
+    def __init__(self, directory, writer, regions):
+        self.directory = directory
+        self.writer = writer  # BackgroundWriter мира
+        self.regions = regions  # RegionStore мира
+        self.file = None
+        segments = self.segments()
+        self.index = int(_SEGMENT_RE.search(segments[-1]).group(1)) + 1 if segments else 0
+        self.unsynced = False
+        self.sync_timer = 0.0
+        self.appended = 0
+        self.chunk_writes = []  # Future записей снимков чанков с последней ротации - от них зависит удаление сегмента
+        self.kept = []  # Закрытые сегменты, ждущие записи снимков (меняется только в потоке записи)
+
+    def segment_path(self, index):
+        return os.path.join(self.directory, f"journal_{index}.bin")
+
+    def segments(self):
+        paths = [p for p in glob.glob(os.path.join(self.directory, "journal_*.bin")) if _SEGMENT_RE.search(p)]
+        return sorted(paths, key=lambda p: int(_SEGMENT_RE.search(p).group(1)))
+
+    def replay(self):
+        """Проигрывает сегменты прошлого запуска в хранилище чанков и удаляет их. Возвращает число правок"""
+        regions = self.regions
+        paths = self.segments()
+        chunks = {}  # (cx, cy) -> (сетка, мета)
+        count = 0
+        for path in paths:
+            for kind, wx, wy, payload in read_records(path):
+                key = (wx // CHUNK_SIZE, wy // CHUNK_SIZE)
+                state = chunks.get(key)
+                if state is None:
+                    saved = regions.load(*key)
+                    if saved is not None:
+                        state = (bytearray(saved[0]), dict(saved[1]))
+                    else:
+                        state = (bytearray(generate_chunk(*key).tobytes()), {})
+                    chunks[key] = state
+
+                idx = cell_index(wx % CHUNK_SIZE, wy % CHUNK_SIZE)
+                if kind == EDIT_BLOCK:
+                    state[0][idx] = payload[0]
+                    state[1].pop(idx, None)
+                elif kind == EDIT_META:
+                    state[1][idx] = json.loads(payload)
+                count += 1
+
+        for (cx, cy), (grid, meta) in chunks.items(): regions.save(cx, cy, grid, meta)
+        for path in paths: os.remove(path)
+        return count
+
+    def _append(self, kind, wx, wy, payload):
+        if self.file is None: self.file = open(self.segment_path(self.index), "ab")
+        key = _RECORD_KEY.pack(kind, wx, wy, len(payload))
+        self.file.write(key + _RECORD_CRC.pack(zlib.crc32(key + payload)) + payload)
+        self.file.flush()
+        self.unsynced = True
+        self.appended += 1
+
+    def block_set(self, wx, wy, block_type):
+        self._append(EDIT_BLOCK, wx, wy, bytes((block_type,)))
+
+    def meta_set(self, wx, wy, meta):
+        self._append(EDIT_META, wx, wy, json.dumps(meta, separators=(",", ":")).encode("utf-8"))
+
+    def depends_on(self, write):
+        """Запись снимка чанка (future BackgroundWriter), которая должна пройти, прежде чем сегмент можно удалить"""
+        self.chunk_writes.append(write)
+
+    def update(self, dt):
+        self.sync_timer += dt
+        if self.unsynced and self.sync_timer >= JOURNAL_SYNC_INTERVAL:
+            self.sync_timer = 0.0
+            self.unsynced = False
+            self.writer.submit(os.fsync, self.file.fileno(), counted=False)
+
+    def rotate(self):
+        """Новый сегмент. Вызывается сразу после снимка всех измененных чанков: снимки, которые раньше
+        не удалось записать, ставятся на повторную запись, а старые сегменты удаляются в потоке записи
+        после всех этих снимков, только если ни одного незаписанного снимка не осталось"""
+        for cx, cy in self.regions.failed_chunks():
+            self.depends_on(self.writer.submit(self.regions.write_pending, cx, cy))
+        writes, self.chunk_writes = self.chunk_writes, []
+        old_file = self.file
+        if old_file is not None:
+            self.file = None
+            self.index += 1
+            self.unsynced = False
+        elif not writes:
+            return
+        self.writer.submit(self._retire, old_file, writes, counted=False)
+
+    def _retire(self, file, writes):
+        # Поток записи один, поэтому все writes поставлены раньше и уже завершены. failed_chunks()
+        # покрывает и ошибки прошлых ротаций, которые еще не были в очереди на момент rotate()
+        if file is not None:
+            file.close()
+            self.kept.append(file.name)
+        if any(write.exception() is not None for write in writes) or self.regions.failed_chunks():
+            print(f"Не все снимки чанков записаны, сегменты журнала оставлены до следующей записи: {len(self.kept)}")
+            return
+        for path in self.kept: os.remove(path)
+        self.kept = []
+
+    def close(self):
+        """Закрывает текущий сегмент (вызывать после остановки потока записи)"""
+        if self.file is None: return
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.file.close()
+        self.file = None
@@ -0,0 +1,214 @@
+from collections import Counter
+
+from .constants import *
+from .recipes import RECIPES
+
+CHEST_MAX_STACKS = 10
+
+
+class Machine:
+    """Механизм: входные буферы (счетчики загруженных предметов) и выходной буфер.
+
+    Обработка запускается только событием входа - accept(), когда стопка предметов попала в механизм.
+    Готовые предметы копятся в output, игра забирает их через drain() и выбрасывает наружу.
+    to_meta()/from_meta() - формат сохранения в файле региона.
+    """
+    __slots__ = ("output",)
+
+    def __init__(self):
+        self.output = []
+
+    def accept(self, item_type, count=1):
+        """Событие входа: сколько предметов из стопки механизм принял (0 - не принял ни одного)"""
+        taken = self.take(item_type, count)
+        if taken: self.process()
+        return taken
+
+    def take(self, item_type, count):
+        return 0
+
+    def process(self):
+        pass
+
+    def emit(self, item_type, count=1):
+        if count > 0: self.output.append((item_type, count))
+
+    def drain(self):
+        """Забирает накопленные на выходе предметы: список (тип, количество)"""
+        output, self.output = self.output, []
+        return output
+
+    def eject(self):
+        """Переносит все содержимое в выходной буфер. True, если было что выбрасывать"""
+        items = self.contents()
+        for item_type, count in items: self.emit(item_type, count)
+        self.clear()
+        return bool(items)
+
+    def contents(self):
+        """Содержимое для подсказки и выброса: список (тип, количество) с ненулевым количеством"""
+        return []
+
+    def clear(self):
+        pass
+
+    def to_meta(self):
+        return {}
+
+    def load_meta(self, saved):
+        pass
+
+    @classmethod
+    def from_meta(cls, saved=None):
+        machine = cls()
+        if saved: machine.load_meta(saved)
+        return machine
+
+
+class Converter(Machine):
+    """Механизм-переработчик: буфер входных предметов, рецепты из общего реестра (по имени механизма).
+    Сохраняется как {"in": {тип: количество}}; старые короткие ключи читаются через LEGACY_KEYS."""
+    __slots__ = ("inputs",)
+    name = ""
+    LEGACY_KEYS = {}
+
+    def __init__(self):
+        super().__init__()
+        self.inputs = {}
+
+    def take(self, item_type, count):
+        if not RECIPES.accepts(self.name, item_type): return 0
+        self.inputs[item_type] = self.inputs.get(item_type, 0) + count
+        return count
+
+    def process(self):
+        for item_type, count in RECIPES.convert(self.name, self.inputs): self.emit(item_type, count)
+
+    def contents(self):
+        return [(k, v) for k, v in self.inputs.items() if v > 0]
+
+    def clear(self):
+        self.inputs.clear()
+
+    def to_meta(self):
+        return {"in": {k: v for k, v in self.inputs.items() if v > 0}}
+
+    def load_meta(self, saved):
+        self.inputs = dict(saved.get("in", {}))
+        for key, item_type in self.LEGACY_KEYS.items():
+            if saved.get(key): self.inputs[item_type] = self.inputs.get(item_type, 0) + saved[key]
+
+
+class Press(Converter):
+    __slots__ = ()
+    name = "press"
+    LEGACY_KEYS = {"sc": "scrap", "du": "dust", "sh": "shard"}
+
+
+class Furnace(Converter):
+    __slots__ = ()
+    name = "furnace"
+    LEGACY_KEYS = {"en": "energy_dust"}
+
+    def load_meta(self, saved):
+        super().load_meta(saved)
+        if saved.get("ore"):
+            ore_type = saved.get("ore_t", "copper")
+            self.inputs[ore_type] = self.inputs.get(ore_type, 0) + saved["ore"]
+
+
+class Assembler(Machine):
+    """Копит предметы; энергетическая пыль запускает сборку по рецепту (без рецепта - возвращает пыль)"""
+    __slots__ = ("loaded",)
+
+    def __init__(self):
+        super().__init__()
+        self.loaded = []
+
+    def take(self, item_type, count):
+        # Каждая пыль - отдельный запуск сборки, поэтому из стопки пыли берется по одной
+        if item_type == "energy_dust":
+            self.craft()
+            return 1
+        self.loaded.extend([item_type] * count)
+        return count
+
+    def craft(self):
+        """Сборка по точному совпадению загруженного с рецептом (или с N его наборами сразу)"""
+        recipe, times = RECIPES.match_bulk("assembler", Counter(self.loaded))
+        if recipe is None:
+            self.emit("energy_dust")
+            return
+        self.loaded.clear()
+        for item_type, count in recipe.outputs.items(): self.emit(item_type, count * times)
+
+    def contents(self):
+        return list(Counter(self.loaded).items())
+
+    def clear(self):
+        self.loaded.clear()
+
+    def to_meta(self):
+        return {"ld": list(self.loaded)}
+
+    def load_meta(self, saved):
+        self.loaded = list(saved.get("ld", []))
+
+
+class Chest(Machine):
+    __slots__ = ("inventory",)
+
+    def __init__(self):
+        super().__init__()
+        self.inventory = {}
+
+    def take(self, item_type, count):
+        if len(self.inventory) >= CHEST_MAX_STACKS and item_type not in self.inventory: return 0
+        self.inventory[item_type] = self.inventory.get(item_type, 0) + count
+        return count
+
+    def contents(self):
+        return [(k, v) for k, v in self.inventory.items() if v > 0]
+
+    def clear(self):
+        self.inventory.clear()
+
+    def to_meta(self):
+        return {"inv": dict(self.inventory)}
+
+    def load_meta(self, saved):
+        self.inventory = dict(saved.get("inv", {}))
+
+
+class Terminal(Converter):
+    """Пять урановых стержней дают квантовый бур"""
+    __slots__ = ()
+    name = "terminal"
+    LEGACY_KEYS = {"ur": "uranium_rod"}
+
+    def eject(self):
+        # Стержни из терминала не выбрасываются
+        return False
+
+
+class ChemLab(Converter):
+    __slots__ = ()
+    name = "chem_lab"
+    LEGACY_KEYS = {"sp": "spore", "du": "energy_dust"}
+
+
+# ID блока -> класс механизма
+MACHINE_TYPES = {
+    BLOCK_PRESS: Press,
+    BLOCK_FURNACE: Furnace,
+    BLOCK_ASSEMBLER: Assembler,
+    BLOCK_CHEST: Chest,
+    BLOCK_TERMINAL: Terminal,
+    BLOCK_CHEM_LAB: ChemLab,
+}
+
+
+def new_machine(block_type, saved=None):
+    """Состояние механизма для блока (из сохраненной мета, если есть) или None, если блок не механизм"""
+    machine_cls = MACHINE_TYPES.get(block_type)
+    return machine_cls.from_meta(saved) if machine_cls is not None else None
@@ -47,7 +47,7 @@ class MainMenu(arcade.View):
     def on_click_new_game(self, event):
         """Очистка сохранений и запуск новой игры"""
         if os.path.exists("saves"):
-            for f in glob.glob("saves/*.json"):
+            for f in glob.glob("saves/*.json") + glob.glob("saves/*.bin"):
                 try:
                     os.remove(f)
                 except Exception as e:
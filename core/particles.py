@@ -0,0 +1,95 @@
+from array import array
+
+import numpy as np
+from arcade.gl import BufferDescription
+
+from .constants import *
+
+PARTICLE_VERTEX_SHADER = "assets/shaders/particles_vs.glsl"
+PARTICLE_FRAGMENT_SHADER = "assets/shaders/particles_fs.glsl"
+
+PARTICLE_SIZE = 4
+# Доля частиц, которая реально появляется, по уровню качества (0 - частиц нет)
+PARTICLE_QUALITY_SCALE = (0.0, 0.25, 0.5, 1.0)
+
+
+class Particles:
+    """Пул частиц фиксированного размера на массивах NumPy: позиция, скорость, цвет, прозрачность.
+
+    Живые частицы занимают первые count ячеек; угасшие вытесняются сжатием, ячейки переиспользуются.
+    Сверх бюджета новые частицы не создаются. Без живых частиц update() и отрисовка ничего не стоят.
+    """
+
+    def __init__(self, budget=PARTICLE_BUDGET, quality=PARTICLE_QUALITY):
+        self.budget = budget
+        self.quality = quality
+        self.count = 0
+        self.x, self.y = np.zeros(budget, dtype=np.float32), np.zeros(budget, dtype=np.float32)
+        self.vx, self.vy = np.zeros(budget, dtype=np.float32), np.zeros(budget, dtype=np.float32)
+        self.alpha, self.fade = np.zeros(budget, dtype=np.float32), np.zeros(budget, dtype=np.float32)
+        self.rgb = np.zeros((budget, 3), dtype=np.uint8)
+
+    def __len__(self):
+        return self.count
+
+    def emit(self, x, y, color, amount=1):
+        """Выпускает до amount частиц из точки; число урезается качеством и оставшимся бюджетом"""
+        scaled = amount * PARTICLE_QUALITY_SCALE[self.quality]
+        # Дробная часть округляется случайно, чтобы одиночные частицы не пропадали на низком качестве
+        amount = min(int(scaled + np.random.random()), self.budget - self.count)
+        if amount <= 0: return
+        s = slice(self.count, self.count + amount)
+        self.x[s], self.y[s] = x, y
+        self.vx[s] = np.random.uniform(-1, 1, amount)
+        self.vy[s] = np.random.uniform(0.5, 2.5, amount)
+        self.alpha[s] = 255
+        self.fade[s] = np.random.uniform(10, 20, amount)
+        self.rgb[s] = color[:3]
+        self.count += amount
+
+    def update(self):
+        n = self.count
+        if not n: return
+        self.x[:n] += self.vx[:n]
+        self.y[:n] += self.vy[:n]
+        self.vy[:n] -= GRAVITY * 0.3
+        self.alpha[:n] -= self.fade[:n]
+
+        alive = self.alpha[:n] > 0
+        if alive.all(): return
+        keep = int(alive.sum())
+        for arr in (self.x, self.y, self.vx, self.vy, self.alpha, self.fade, self.rgb):
+            arr[:keep] = arr[:n][alive]
+        self.count = keep
+
+    def clear(self):
+        self.count = 0
+
+
+class ParticleRenderer:
+    """Рисует пул частиц одним инстансным вызовом: на экземпляр (x, y) и цвет RGBA в байтах"""
+
+    def __init__(self, ctx, budget=PARTICLE_BUDGET):
+        self.ctx = ctx
+        self.program = ctx.load_program(vertex_shader=PARTICLE_VERTEX_SHADER,
+                                        fragment_shader=PARTICLE_FRAGMENT_SHADER)
+        self.program["particle_px"] = PARTICLE_SIZE
+        quad = ctx.buffer(data=array("f", [0, 0, 1, 0, 0, 1, 1, 1]))
+        self.data = np.zeros(budget, dtype=[("pos", np.float32, 2), ("color", np.uint8, 4)])
+        self.instances = ctx.buffer(reserve=self.data.nbytes)
+        self.geometry = ctx.geometry([
+            BufferDescription(quad, "2f", ["in_pos"]),
+            BufferDescription(self.instances, "2f 4f1", ["in_center", "in_color"], instanced=True),
+        ], mode=ctx.TRIANGLE_STRIP)
+
+    def draw(self, particles):
+        n = len(particles)
+        if n == 0: return
+        data = self.data[:n]
+        data["pos"][:, 0], data["pos"][:, 1] = particles.x[:n], particles.y[:n]
+        data["color"][:, :3] = particles.rgb[:n]
+        data["color"][:, 3] = particles.alpha[:n]
+        self.instances.write(data.tobytes())
+
+        self.ctx.enable(self.ctx.BLEND)
+        self.geometry.render(self.program, instances=n)
@@ -0,0 +1,143 @@
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import arcade
+
+from .text import TextLayer
+
+PERF_HISTORY = 120  # Кадров в графике и в средних значениях оверлея
+PERF_TEXT_REFRESH = 15  # Раз во сколько кадров обновлять цифры оверлея (чтобы они читались)
+PERF_GRAPH_SCALE = 3  # Пикселей графика на миллисекунду
+
+
+class FrameTimings:
+    """Время подсистем по кадрам: section() копит время текущего кадра, end_frame() переносит его в историю.
+    Без end_frame() (симуляция без окна) копятся только суммы текущего кадра."""
+
+    def __init__(self, history=PERF_HISTORY):
+        self.history = history
+        self.current = {}
+        self.samples = {}  # Имя -> очередь секунд по кадрам
+        self.frames = deque(maxlen=history)  # Время между соседними end_frame()
+        self.last_frame = None
+
+    @contextmanager
+    def section(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def add(self, name, seconds):
+        self.current[name] = self.current.get(name, 0.0) + seconds
+
+    def end_frame(self):
+        now = time.perf_counter()
+        if self.last_frame is not None: self.frames.append(now - self.last_frame)
+        self.last_frame = now
+        for name in self.current.keys() - self.samples.keys():
+            self.samples[name] = deque(maxlen=self.history)
+        for name, samples in self.samples.items():
+            samples.append(self.current.get(name, 0.0))
+        self.current = {}
+
+    def average_ms(self, name):
+        samples = self.samples.get(name)
+        return sum(samples) / len(samples) * 1000 if samples else 0.0
+
+
+class GpuTimings(FrameTimings):
+    """Время отрисовки на GPU по запросам OpenGL (GL_TIME_ELAPSED), если контекст их поддерживает.
+    Результат запроса читается в конце кадра и ждет GPU, поэтому замер включается только с оверлеем."""
+
+    def __init__(self, ctx, history=PERF_HISTORY):
+        super().__init__(history)
+        self.ctx = ctx
+        self.enabled = False
+        self.queries = {}
+        self.used = []
+        try:
+            ctx.query(samples=False, time=True, primitives=False).delete()
+            self.supported = True
+        except NotImplementedError:
+            self.supported = False
+
+    @contextmanager
+    def section(self, name):
+        if not (self.enabled and self.supported):
+            yield
+            return
+        query = self.queries.get(name)
+        if query is None:
+            query = self.queries[name] = self.ctx.query(samples=False, time=True, primitives=False)
+        with query:
+            yield
+        self.used.append(name)
+
+    def end_frame(self):
+        for name in self.used: self.add(name, self.queries[name].time_elapsed / 1e9)
+        self.used = []
+        super().end_frame()
+
+
+class PerfOverlay:
+    """Оверлей производительности (F3): график времени кадра, время подсистем на ЦП и GPU, счетчики мира"""
+
+    def __init__(self, ctx):
+        self.visible = False
+        self.gpu = GpuTimings(ctx)
+        self.text = TextLayer()
+        self.lines = []
+        self.frame = 0
+
+    def toggle(self):
+        self.visible = not self.visible
+        self.gpu.enabled = self.visible
+
+    @contextmanager
+    def section(self, timings, name):
+        """Замер участка отрисовки сразу на ЦП и на GPU"""
+        with timings.section(name), self.gpu.section(name):
+            yield
+
+    def end_frame(self, timings):
+        timings.end_frame()
+        self.gpu.end_frame()
+
+    def _build_lines(self, timings, counts):
+        frames = timings.frames
+        frame_ms = sum(frames) / len(frames) * 1000 if frames else 0.0
+        worst_ms = max(frames) * 1000 if frames else 0.0
+        gpu = "" if self.gpu.supported else " (GPU-таймеры недоступны)"
+        lines = [f"Кадр: {frame_ms:.2f} мс, худший {worst_ms:.2f} мс, {1000 / max(frame_ms, 1e-6):.0f} FPS{gpu}"]
+        for name in sorted(timings.samples):
+            line = f"{name}: {timings.average_ms(name):.2f} мс"
+            if name in self.gpu.samples: line += f" / GPU {self.gpu.average_ms(name):.2f} мс"
+            lines.append(line)
+        lines.extend(f"{name}: {value}" for name, value in counts)
+        return lines
+
+    def draw(self, timings, counts, height):
+        """timings - FrameTimings игры, counts - список пар (подпись, значение). Рисуется в экранной камере"""
+        if not self.visible: return
+        if self.frame % PERF_TEXT_REFRESH == 0: self.lines = self._build_lines(timings, counts)
+        self.frame += 1
+
+        top = height - 10
+        graph_h = 100
+        width = 10 + 3 * PERF_HISTORY
+        arcade.draw_rect_filled(arcade.LRBT(5, width + 5, top - graph_h - 18 * len(self.lines) - 20, top + 5),
+                                (0, 0, 0, 180))
+        # Линия бюджета кадра при 60 FPS; выше нее график обрезается
+        budget_y = top - graph_h + 1000 / 60 * PERF_GRAPH_SCALE
+        arcade.draw_line(10, budget_y, width, budget_y, arcade.color.DARK_GREEN, 1)
+        if len(timings.frames) > 1:
+            points = [(10 + 3 * i, top - graph_h + min(seconds * 1000, graph_h / PERF_GRAPH_SCALE) * PERF_GRAPH_SCALE)
+                      for i, seconds in enumerate(timings.frames)]
+            arcade.draw_line_strip(points, arcade.color.YELLOW, 1)
+
+        for i, line in enumerate(self.lines):
+            self.text.show(("perf", i), line, 10, top - graph_h - 18 * (i + 1), arcade.color.WHITE, 11)
+        self.text.draw()
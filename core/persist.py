@@ -0,0 +1,125 @@
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+SAVE_DELAY = 1.0  # Секунд без изменений, после которых файл записывается
+SAVE_MAX_DELAY = 5.0  # Дольше этого изменения не копятся, даже если идут без перерыва
+
+
+class BackgroundWriter:
+    """Один фоновый поток записи на диск: задачи выполняются строго по очереди (порядок записи снимков
+    и удаления журнала на это опирается, поэтому поток ровно один).
+    progress() - сколько задач текущей серии записано, чтобы показать ход сохранения; служебные задачи
+    (fsync и ротация журнала) ставятся с counted=False и в ход сохранения не входят.
+    Счетчики меняются из основного потока и из потока записи, поэтому только под lock."""
+
+    def __init__(self, name="writer"):
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=name)
+        self.lock = threading.Lock()
+        self.queued = 0
+        self.done = 0
+        self.errors = 0
+        self.batch = 0  # Значение queued в начале текущей серии записей
+
+    def submit(self, func, *args, counted=True):
+        if counted:
+            with self.lock:
+                if self.done == self.queued: self.batch = self.queued
+                self.queued += 1
+        return self.executor.submit(self._run, counted, func, *args)
+
+    def _run(self, counted, func, *args):
+        """Любая ошибка задачи считается в errors и остается в ее future - по нему проверяют зависимые задачи"""
+        failed = False
+        try:
+            return func(*args)
+        except Exception as e:
+            failed = True
+            print(f"Ошибка фоновой записи: {e!r}")
+            raise
+        finally:
+            with self.lock:
+                if counted: self.done += 1
+                if failed: self.errors += 1
+
+    @property
+    def busy(self):
+        with self.lock:
+            return self.done < self.queued
+
+    def progress(self):
+        """(записано, всего) в текущей серии или None, если писать нечего"""
+        with self.lock:
+            if self.done >= self.queued: return None
+            return self.done - self.batch, self.queued - self.batch
+
+    def wait(self):
+        """Ждет, пока будет записано все, что поставлено в очередь"""
+        self.executor.submit(lambda: None).result()
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+
+
+class WriteBehindJSON:
+    """Отложенная запись JSON-файла состояния (инвентарь игрока и т.п.).
+
+    mark_dirty() только отмечает изменение; update(dt) пишет файл, когда изменения затихли на
+    SAVE_DELAY или копятся дольше SAVE_MAX_DELAY, flush() - сразу (пауза, сохранение, выход).
+    Запись идет во временный файл и заменяет старый через os.replace, поэтому при падении
+    на диске остается либо прошлая, либо новая версия целиком. С writer (BackgroundWriter)
+    снимок данных делается в вызывающем потоке, а пишется в фоновом.
+    """
+
+    def __init__(self, path, get_data, writer=None, delay=SAVE_DELAY, max_delay=SAVE_MAX_DELAY):
+        self.path = path
+        self.get_data = get_data  # Функция, возвращающая сохраняемые данные
+        self.writer = writer
+        self.lock = threading.Lock()
+        self.delay = delay
+        self.max_delay = max_delay
+        self.dirty = False
+        self.idle = 0.0  # Секунд с последнего изменения
+        self.age = 0.0  # Секунд с первого незаписанного изменения
+        self.writes = 0
+        self.changes = 0
+
+    def load(self):
+        """Данные из файла или None, если файла нет"""
+        if not os.path.exists(self.path): return None
+        with open(self.path, "r") as f:
+            return json.load(f)
+
+    def mark_dirty(self):
+        if not self.dirty: self.age = 0.0
+        self.dirty = True
+        self.idle = 0.0
+        self.changes += 1
+
+    def update(self, dt):
+        if not self.dirty: return
+        self.idle += dt
+        self.age += dt
+        if self.idle >= self.delay or self.age >= self.max_delay: self.flush()
+
+    def flush(self):
+        """Сохраняет текущие данные сразу (даже без изменений - так файл появляется при первом сохранении)"""
+        text = json.dumps(self.get_data())
+        self.dirty = False
+        if self.writer is None:
+            self.write(text)
+        else:
+            self.writer.submit(self.write, text)
+
+    def write(self, text):
+        with self.lock:
+            directory = os.path.dirname(self.path)
+            if directory: os.makedirs(directory, exist_ok=True)
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w") as f:
+                f.write(text)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+            self.writes += 1
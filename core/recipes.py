@@ -0,0 +1,83 @@
+import json
+import math
+from collections import defaultdict
+
+RECIPES_FILE = "assets/data/recipes.json"
+
+
+def recipe_key(items):
+    """Канонический ключ мультимножества предметов: отсортированные пары (тип, количество)"""
+    return tuple(sorted((item, count) for item, count in items.items() if count > 0))
+
+
+class Recipe:
+    __slots__ = ("machine", "inputs", "outputs", "key")
+
+    def __init__(self, machine, inputs, outputs):
+        self.machine = machine
+        self.inputs = dict(inputs)
+        self.outputs = dict(outputs)
+        self.key = recipe_key(self.inputs)
+
+
+class RecipeRegistry:
+    """Общий реестр рецептов всех механизмов.
+
+    Точное совпадение загруженных предметов с рецептом ищется по каноническому ключу за O(1).
+    Конвертеры (пресс, печь, ...) перерабатывают свой буфер сразу на N результатов за шаг.
+    """
+
+    def __init__(self):
+        self.by_key = {}  # (механизм, ключ) -> рецепт
+        self.by_machine = defaultdict(list)
+        self.inputs = defaultdict(set)  # Механизм -> предметы, которые он принимает
+
+    def add(self, machine, inputs, outputs):
+        recipe = Recipe(machine, inputs, outputs)
+        if (machine, recipe.key) in self.by_key:
+            raise ValueError(f"Повторный рецепт для '{machine}': {dict(recipe.key)}")
+        self.by_key[(machine, recipe.key)] = recipe
+        self.by_machine[machine].append(recipe)
+        self.inputs[machine].update(recipe.inputs)
+        return recipe
+
+    def load(self, path):
+        with open(path, "r") as f:
+            data = json.load(f)
+        for machine, recipes in data.items():
+            for recipe in recipes:
+                self.add(machine, recipe["in"], recipe["out"])
+        return self
+
+    def accepts(self, machine, item_type):
+        return item_type in self.inputs.get(machine, ())
+
+    def match(self, machine, items):
+        """Рецепт, входы которого в точности равны items, или None"""
+        return self.by_key.get((machine, recipe_key(items)))
+
+    def match_bulk(self, machine, items):
+        """(рецепт, N), если items - ровно N наборов входов одного рецепта; иначе (None, 0)"""
+        key = recipe_key(items)
+        if not key: return None, 0
+        common = 0
+        for _, count in key: common = math.gcd(common, count)
+        for times in range(common, 0, -1):
+            if common % times: continue
+            recipe = self.by_key.get((machine, tuple((item, count // times) for item, count in key)))
+            if recipe is not None: return recipe, times
+        return None, 0
+
+    def convert(self, machine, buffer):
+        """Перерабатывает буфер {тип: количество} по всем рецептам механизма.
+        Забирает входы из буфера и возвращает выход: список (тип, количество)"""
+        output = []
+        for recipe in self.by_machine.get(machine, ()):
+            times = min(buffer.get(item, 0) // count for item, count in recipe.inputs.items())
+            if times <= 0: continue
+            for item, count in recipe.inputs.items(): buffer[item] -= count * times
+            for item, count in recipe.outputs.items(): output.append((item, count * times))
+        return output
+
+
+RECIPES = RecipeRegistry().load(RECIPES_FILE)
@@ -0,0 +1,288 @@
+import glob
+import json
+import mmap
+import os
+import re
+import struct
+import threading
+from collections import OrderedDict
+
+from .constants import *
+
+REGION_MAGIC = b"QRRG"
+REGION_VERSION = 1
+CHUNK_CELLS = CHUNK_SIZE * CHUNK_SIZE
+
+# Заголовок: магия, версия, резерв. Затем таблица (offset, length) на каждый чанк региона
+_HEADER = struct.Struct("<4sHH")
+_ENTRY = struct.Struct("<II")
+TABLE_OFFSET = _HEADER.size
+DATA_OFFSET = TABLE_OFFSET + _ENTRY.size * REGION_SIZE * REGION_SIZE
+
+# Доля мусора (перезаписанных записей), после которой файл региона сжимается
+COMPACT_WASTE_RATIO = 0.5
+
+
+def cell_index(lx, ly):
+    return lx * CHUNK_SIZE + ly
+
+
+def region_coords(cx, cy):
+    return cx // REGION_SIZE, cy // REGION_SIZE
+
+
+class RegionFile:
+    """Бинарный файл региона: REGION_SIZE x REGION_SIZE чанков в одном файле.
+
+    Запись чанка = сетка ID блоков (CHUNK_CELLS байт) + разреженная секция мета-данных (JSON
+    только для клеток с мета). Новые записи дописываются в конец, затем обновляется таблица,
+    поэтому старая версия чанка остается целой до последнего момента. Чтение идет через mmap.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        exists = os.path.exists(path)
+        if exists and os.path.getsize(path) < DATA_OFFSET:
+            # Оборванный или испорченный файл не затирается: он откладывается рядом, регион создается заново
+            corrupt_path = path + ".corrupt"
+            os.replace(path, corrupt_path)
+            print(f"Файл региона {path} короче заголовка, перенесен в {corrupt_path}")
+            exists = False
+        self.file = open(path, "r+b" if exists else "w+b")
+        if not exists:
+            self.file.write(_HEADER.pack(REGION_MAGIC, REGION_VERSION, 0))
+            self.file.write(bytes(DATA_OFFSET - TABLE_OFFSET))
+            self.file.flush()
+
+        self.mm = None
+        self._remap()
+
+        magic, version, _ = _HEADER.unpack_from(self.mm, 0)
+        if magic != REGION_MAGIC or version != REGION_VERSION:
+            self.close()
+            raise ValueError(f"Неизвестный формат файла региона: {path}")
+
+        self.used_bytes = sum(_ENTRY.unpack_from(self.mm, TABLE_OFFSET + i * _ENTRY.size)[1]
+                              for i in range(REGION_SIZE * REGION_SIZE))
+
+    def _remap(self):
+        if self.mm is not None: self.mm.close()
+        self.mm = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    @staticmethod
+    def _entry_pos(cx, cy):
+        return TABLE_OFFSET + ((cx % REGION_SIZE) * REGION_SIZE + (cy % REGION_SIZE)) * _ENTRY.size
+
+    @property
+    def waste_bytes(self):
+        return len(self.mm) - DATA_OFFSET - self.used_bytes
+
+    def read_chunk(self, cx, cy):
+        """Возвращает (grid: bytes, meta: {cell_index: dict}) или None, если чанк не сохранен"""
+        offset, length = _ENTRY.unpack_from(self.mm, self._entry_pos(cx, cy))
+        if length == 0: return None
+
+        grid = self.mm[offset:offset + CHUNK_CELLS]
+        meta = {}
+        if length > CHUNK_CELLS:
+            raw_meta = json.loads(self.mm[offset + CHUNK_CELLS:offset + length])
+            meta = {int(k): v for k, v in raw_meta.items()}
+        return grid, meta
+
+    def write_chunk(self, cx, cy, grid, meta):
+        payload = bytes(grid)
+        if len(payload) != CHUNK_CELLS:
+            raise ValueError(f"Сетка чанка должна содержать {CHUNK_CELLS} байт, получено {len(payload)}")
+        sparse_meta = {str(k): v for k, v in meta.items() if v}
+        if sparse_meta:
+            payload += json.dumps(sparse_meta, separators=(",", ":")).encode("utf-8")
+
+        entry_pos = self._entry_pos(cx, cy)
+        _, old_length = _ENTRY.unpack_from(self.mm, entry_pos)
+
+        self.file.seek(0, os.SEEK_END)
+        offset = self.file.tell()
+        self.file.write(payload)
+        self.file.flush()
+        # Данные на диске раньше ссылки на них, ссылка - раньше, чем журнал правок удалит сегмент
+        os.fsync(self.file.fileno())
+        self.file.seek(entry_pos)
+        self.file.write(_ENTRY.pack(offset, len(payload)))
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+        self.used_bytes += len(payload) - old_length
+        self._remap()
+
+        if self.waste_bytes > max(self.used_bytes, CHUNK_CELLS * REGION_SIZE) * COMPACT_WASTE_RATIO:
+            self.compact()
+
+    def compact(self):
+        """Переписывает регион без устаревших записей (через временный файл и атомарную замену)"""
+        tmp_path = self.path + ".tmp"
+        table = bytearray(DATA_OFFSET - TABLE_OFFSET)
+        with open(tmp_path, "wb") as out:
+            out.write(_HEADER.pack(REGION_MAGIC, REGION_VERSION, 0))
+            out.write(table)
+            pos = DATA_OFFSET
+            for i in range(REGION_SIZE * REGION_SIZE):
+                offset, length = _ENTRY.unpack_from(self.mm, TABLE_OFFSET + i * _ENTRY.size)
+                if length == 0: continue
+                out.write(self.mm[offset:offset + length])
+                _ENTRY.pack_into(table, i * _ENTRY.size, pos, length)
+                pos += length
+            out.seek(TABLE_OFFSET)
+            out.write(table)
+            out.flush()
+            os.fsync(out.fileno())
+
+        self.mm.close()
+        self.mm = None
+        self.file.close()
+        os.replace(tmp_path, self.path)
+        self.file = open(self.path, "r+b")
+        self._remap()
+
+    def close(self):
+        if self.mm is not None:
+            self.mm.close()
+            self.mm = None
+        if not self.file.closed:
+            self.file.close()
+
+
+class RegionStore:
+    """Хранилище чанков поверх файлов регионов с ограниченным числом открытых файлов.
+    Потокобезопасно: чанки читаются фоновыми загрузчиками и пишутся из основного или фонового потока.
+
+    save_later() кладет снимок чанка в очередь, write_pending() записывает его позже (в потоке записи).
+    Пока снимок не записан, load() возвращает его, а не старую версию из файла. Снимок, запись которого
+    не удалась, остается в очереди и в failed, пока его (или более новый снимок чанка) не запишут."""
+
+    def __init__(self, directory="saves", max_open=16):
+        self.directory = directory
+        self.max_open = max_open
+        self.files = OrderedDict()
+        self.pending = {}  # (cx, cy) -> (сетка, мета) еще не записанного снимка
+        self.failed = set()  # Чанки, снимок которых не удалось записать - ждут повторной записи
+        self.lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def region_path(self, rx, ry):
+        return os.path.join(self.directory, f"region_{rx}_{ry}.bin")
+
+    def _get(self, cx, cy, create):
+        key = region_coords(cx, cy)
+        region = self.files.get(key)
+        if region is not None:
+            self.files.move_to_end(key)
+            return region
+
+        path = self.region_path(*key)
+        if not create and not os.path.exists(path): return None
+
+        region = RegionFile(path)
+        self.files[key] = region
+        if len(self.files) > self.max_open:
+            _, oldest = self.files.popitem(last=False)
+            oldest.close()
+        return region
+
+    def load(self, cx, cy):
+        with self.lock:
+            snapshot = self.pending.get((cx, cy))
+            if snapshot is not None: return snapshot
+            region = self._get(cx, cy, create=False)
+            if region is None: return None
+            return region.read_chunk(cx, cy)
+
+    def save(self, cx, cy, grid, meta):
+        with self.lock:
+            self.pending.pop((cx, cy), None)
+            self._get(cx, cy, create=True).write_chunk(cx, cy, grid, meta)
+            self.failed.discard((cx, cy))
+
+    def save_later(self, cx, cy, grid, meta):
+        """Снимок чанка в очередь записи (более новый снимок того же чанка заменяет старый)"""
+        with self.lock:
+            self.pending[(cx, cy)] = (bytes(grid), meta)
+
+    def write_pending(self, cx, cy):
+        """Записывает снимок чанка из очереди, если он еще там. True, если запись была"""
+        with self.lock:
+            snapshot = self.pending.pop((cx, cy), None)
+            if snapshot is None: return False
+            try:
+                self._get(cx, cy, create=True).write_chunk(cx, cy, *snapshot)
+            except Exception:
+                # Снимок возвращается в очередь (если его не сменил более новый): его запишет следующая попытка
+                self.pending.setdefault((cx, cy), snapshot)
+                self.failed.add((cx, cy))
+                raise
+            self.failed.discard((cx, cy))
+            return True
+
+    def failed_chunks(self):
+        """Чанки, снимки которых ждут повторной записи после ошибки"""
+        with self.lock:
+            return list(self.failed)
+
+    def flush(self):
+        """Записывает все снимки из очереди"""
+        with self.lock: keys = list(self.pending)
+        for key in keys: self.write_pending(*key)
+
+    def close(self):
+        self.flush()
+        with self.lock:
+            for region in self.files.values():
+                region.close()
+            self.files.clear()
+
+
+_JSON_CHUNK_RE = re.compile(r"chunk_(-?\d+)_(-?\d+)\.json$")
+
+
+def migrate_json_saves(store):
+    """Однократный перенос старых сохранений saves/chunk_{cx}_{cy}.json в файлы регионов.
+    Возвращает (перенесено, с ошибкой); файлы с ошибкой остаются на месте и пробуются при следующем запуске"""
+    migrated = failed = 0
+    for path in glob.glob(os.path.join(store.directory, "chunk_*.json")):
+        match = _JSON_CHUNK_RE.search(os.path.basename(path))
+        if not match: continue
+        cx, cy = int(match.group(1)), int(match.group(2))
+
+        try:
+            with open(path, "r") as f:
+                raw_data = json.load(f)
+
+            grid = bytearray(CHUNK_CELLS)
+            meta = {}
+            for key, val in raw_data.items():
+                lx, ly = map(int, key.split('_'))
+                idx = cell_index(lx, ly)
+                if isinstance(val, dict):
+                    grid[idx] = val.get("type", BLOCK_EMPTY)
+                    if val.get("meta"): meta[idx] = val["meta"]
+                else:
+                    grid[idx] = val
+        except (OSError, ValueError, TypeError, AttributeError) as e:
+            print(f"Ошибка миграции чанка {path}: {e}")
+            failed += 1
+            continue
+
+        store.save(cx, cy, grid, meta)
+        os.remove(path)
+        migrated += 1
+    return migrated, failed
+
+
+if __name__ == "__main__":
+    import sys
+
+    saves_dir = sys.argv[1] if len(sys.argv) > 1 else "saves"
+    region_store = RegionStore(saves_dir)
+    count, failed = migrate_json_saves(region_store)
+    region_store.close()
+    print(f"Перенесено чанков: {count}, с ошибкой: {failed}")
+    if failed: sys.exit(1)
@@ -0,0 +1,485 @@
+import os
+import math
+import random
+import sys
+import tempfile
+import time
+
+import arcade
+import numpy as np
+
+from .constants import *
+from .world import (World, block_lut, WALL_BLOCKS, METAL_BLOCKS, FRAGILE_BLOCKS, INTERACTABLE_BLOCKS,
+                    HITTABLE_BLOCKS, UNBREAKABLE_BLOCKS, HARD_BLOCKS, SOLID_BLOCKS)
+from .player import Player
+from .machines import MACHINE_TYPES
+from .ticks import TICK_GEYSER, TICK_DISSOLVE
+from .items import DroppedItems, box_hits, random_drop_velocity
+from .particles import Particles
+from .perf import FrameTimings
+from .persist import WriteBehindJSON
+
+
+SOLID_LUT = block_lut(SOLID_BLOCKS)
+WALL_LUT = block_lut(WALL_BLOCKS)
+
+
+class DamageText:
+    """Всплывающая цифра урона; рисуется через слой надписей мира"""
+    __slots__ = ("text", "x", "y", "change_y", "alpha")
+
+    def __init__(self, text, x, y):
+        self.text = text
+        self.x = x
+        self.y = y
+        self.change_y = 1.0
+        self.alpha = 255
+
+    def update(self):
+        self.y += self.change_y
+        self.alpha -= 5
+
+
+class GameSimulation:
+    """Вся игровая логика без окна и OpenGL: мир и подгрузка чанков, игрок и физика, предметы, механизмы,
+    опасности. GameView добавляет к ней отрисовку и ввод; без окна симуляцию можно гонять быстрее
+    реального времени (python -m core.sim).
+    """
+
+    def __init__(self, save_dir="saves"):
+        self.save_dir = save_dir
+        self.inventory_path = os.path.join(save_dir, "player_inventory.json")
+
+        self.time_elapsed = 0.0
+        self.sim_tick = 0
+        self.sim_accumulator = 0.0
+        self.uranium_timer = 0.0
+        self.max_depth = 0
+        self.autosave_timer = 0.0
+
+        self.world = World(save_dir)
+        # Инвентарь пишется на диск отложенно и в потоке записи мира: подбор стопки предметов - одна запись
+        self.inventory_store = WriteBehindJSON(self.inventory_path, lambda: self.player.inventory,
+                                               writer=self.world.writer)
+        self.player = Player()
+        self.player_prev_position = self.player.position  # Позиция до последнего шага симуляции
+        self.dropped_items = DroppedItems()
+        self.particles = Particles()
+        self.damage_texts = []
+        self.physics_engine = None
+        self.walls_version = 0
+        self.timings = FrameTimings()  # Время подсистем по кадрам (оверлей F3)
+
+        self.selected_slot_index = 0
+        self.slot_contents = [None] * UI_HOTBAR_SLOTS
+
+        self.show_interact_hint = False
+        self.show_teleport_menu = False
+        self.current_interactable = None
+        self.is_dead = False
+
+    def reset(self):
+        """Начало игры: сброс предметов и частиц, инвентарь из сохранения, чанки вокруг игрока"""
+        self.dropped_items.clear()
+        self.particles.clear()
+        self.is_dead = False
+        self.sim_accumulator = 0.0
+        self.player_prev_position = self.player.position
+        self.load_inventory()
+
+        self.world.update_chunks(self.player.center_x, self.player.center_y, wait=True)
+        self.physics_engine = arcade.PhysicsEnginePlatformer(self.player, gravity_constant=GRAVITY,
+                                                             walls=self.world.solid_lists)
+        self.walls_version = self.world.layers_version
+
+    def advance(self, delta_time):
+        """Накопитель времени кадра: симуляция идет фиксированными шагами SIM_DT независимо от частоты
+        кадров, остаток накопителя идет на интерполяцию отрисовки"""
+        self.inventory_store.update(delta_time)
+        self.world.journal.update(delta_time)
+        if self.is_dead: return
+        self.autosave_timer += delta_time
+        if self.autosave_timer >= AUTOSAVE_INTERVAL: self.save_game()
+        self.sim_accumulator = min(self.sim_accumulator + delta_time, SIM_DT * SIM_MAX_STEPS)
+        while self.sim_accumulator >= SIM_DT and not self.is_dead:
+            self.step_simulation(SIM_DT)
+            self.sim_accumulator -= SIM_DT
+
+    def save_game(self):
+        """Снимок измененных чанков и инвентаря без остановки игры: на диск их пишет фоновый поток мира"""
+        self.autosave_timer = 0.0
+        self.save_inventory()
+        self.world.save_dirty()
+
+    def close(self):
+        """Выход из игры: сохранение и ожидание, пока все снимки будут записаны"""
+        self.save_game()
+        self.world.close()
+
+    def save_inventory(self):
+        self.inventory_store.flush()
+
+    def load_inventory(self):
+        saved_inv = self.inventory_store.load()
+        if saved_inv:
+            for k, v in saved_inv.items(): self.player.inventory[k] = v
+        self.update_hotbar()
+
+    def add_to_inventory(self, item_type, amount=1):
+        self.player.inventory[item_type] = self.player.inventory.get(item_type, 0) + amount
+        self.inventory_store.mark_dirty()
+        self.update_hotbar()
+
+    def remove_from_inventory(self, item_type, amount=1):
+        if self.player.inventory.get(item_type, 0) >= amount:
+            self.player.inventory[item_type] -= amount
+            self.inventory_store.mark_dirty()
+            self.update_hotbar()
+            return True
+        return False
+
+    def update_hotbar(self):
+        for i in range(UI_HOTBAR_SLOTS):
+            item = self.slot_contents[i]
+            if item and self.player.inventory.get(item, 0) <= 0: self.slot_contents[i] = None
+
+        for item, count in self.player.inventory.items():
+            if count > 0 and item not in self.slot_contents:
+                if None in self.slot_contents:
+                    empty_idx = self.slot_contents.index(None)
+                    self.slot_contents[empty_idx] = item
+
+    def spawn_item(self, item_type, x, y, is_thrown=False, direction=1, count=1):
+        """Выбрасывает стопку в мир. Если бюджет выпавших предметов исчерпан и стопку некуда доложить,
+        предметы сразу попадают в инвентарь игрока (брошенный предмет остается в руке)"""
+        vx, vy = (direction * 12, 5) if is_thrown else random_drop_velocity()
+        if not self.dropped_items.spawn(item_type, x, y, vx, vy, thrown=is_thrown, count=count):
+            self.add_to_inventory(item_type, count)
+
+    def take_damage(self, amount):
+        if self.is_dead: return
+        self.player.hp -= amount
+        self.damage_texts.append(DamageText(f"-{amount}", self.player.center_x, self.player.top + 10))
+        if self.player.hp <= 0:
+            self.player.hp = 0
+            self.is_dead = True
+
+    def spawn_machine_output(self, block, machine):
+        """Выбрасывает над механизмом все, что накопилось в его выходном буфере, по стопке на тип"""
+        for item_type, count in machine.drain():
+            self.spawn_item(item_type, block.center_x, block.center_y + SPRITE_PIXEL_SIZE, count=count)
+
+    def eject_items(self, block):
+        machine = self.world.block_machine(block)
+        if machine is None or not machine.eject(): return
+        self.spawn_machine_output(block, machine)
+        self.world.machine_changed(block)
+
+    def get_hover_info(self, block):
+        machine = self.world.block_machine(block)
+        return machine.contents() if machine is not None else []
+
+    def sync_physics_walls(self):
+        """Списки стен чанков меняются при подгрузке - передаем актуальные в физический движок"""
+        if self.walls_version != self.world.layers_version:
+            self.physics_engine.walls[:] = self.world.solid_lists
+            self.walls_version = self.world.layers_version
+
+    def step_simulation(self, dt):
+        self.player_prev_position = self.player.position
+        self.time_elapsed += dt
+        self.sim_tick += 1
+
+        # Считаем глубину (-y)
+        current_depth = max(0, int(-self.player.center_y / SPRITE_PIXEL_SIZE))
+        if current_depth > self.max_depth:
+            self.max_depth = current_depth
+
+        if not self.show_teleport_menu:
+            timings = self.timings
+            self.player.update_movement()
+            with timings.section("physics"): self.physics_engine.update()
+
+            if self.physics_engine.can_jump() and abs(self.player.change_x) > 0:
+                if random.random() < 0.2:
+                    self.particles.emit(self.player.center_x, self.player.bottom, (150, 150, 150, 150))
+
+            self.player.update(dt)
+            with timings.section("particles"): self.particles.update()
+
+            for t in self.damage_texts[:]:
+                t.update()
+                if t.alpha <= 0: self.damage_texts.remove(t)
+
+            with timings.section("chunks"):
+                self.world.update_chunks(self.player.center_x, self.player.center_y,
+                                         self.player.change_x, self.player.change_y)
+                self.sync_physics_walls()
+            with timings.section("items"): self.update_items(dt)
+            with timings.section("interactions"): self.update_interactions(dt)
+            with timings.section("world_blocks"): self.update_world_blocks(dt)
+
+    def update_world_blocks(self, dt):
+        for kind, (wx, wy) in self.world.update_ticks(dt):
+            _, block = self.world.block_at(wx, wy)
+            if block is None: continue
+            if kind == TICK_GEYSER:
+                if abs(self.player.center_x - block.center_x) < 40 and self.player.bottom >= block.top and self.player.bottom < block.top + 100:
+                    self.player.change_y = 20
+                    self.particles.emit(block.center_x, block.top, (200, 255, 255, 100), 5)
+            elif kind == TICK_DISSOLVE:
+                self.world.remove_block(block)
+                self.particles.emit(block.center_x, block.center_y, COLOR_ACID, 3)
+
+    def update_items(self, delta_time):
+        items = self.dropped_items
+        if not len(items): return
+        grid, wx0, wy0 = self.world.loaded_grid()
+        consumed = np.zeros(len(items), dtype=bool)
+
+        # Брошенная колба с кислотой разбивается о стену и растворяет блоки вокруг
+        flasks = np.flatnonzero(items.thrown[:len(items)] & (items.kind[:len(items)] == items.type_id("acid_flask")))
+        if len(flasks):
+            hits = box_hits(grid, wx0, wy0, WALL_LUT, items.x[flasks] + items.vx[flasks],
+                            items.y[flasks] + items.vy[flasks], ITEM_HALF_SIZE)
+            for i in flasks[hits].tolist():
+                consumed[i] = True
+                x, y = float(items.x[i]), float(items.y[i])
+                wx, wy = int(x // SPRITE_PIXEL_SIZE), int(y // SPRITE_PIXEL_SIZE)
+                for _, _, _, b in self.world.blocks_in_rect(wx - 1, wy - 1, wx + 1, wy + 1,
+                                                            WALL_BLOCKS - UNBREAKABLE_BLOCKS):
+                    if b is not None: self.world.remove_block(b)
+                self.particles.emit(x, y, COLOR_ACID, 15)
+
+        items.step(delta_time, grid, wx0, wy0, SOLID_LUT)
+
+        # Стопка влетела в клетку механизма - событие входа, без опроса столкновений со списками.
+        # Выход механизмов выбрасывается после удаления, чтобы индексы масок не сдвигались
+        fed = []
+        for i in np.flatnonzero(items.thrown[:len(items)] & ~consumed).tolist():
+            item_type = items.type_name(i)
+            block_type, block = self.world.block_at(int(items.x[i] // SPRITE_PIXEL_SIZE),
+                                                    int(items.y[i] // SPRITE_PIXEL_SIZE))
+            if block_type == BLOCK_EXTRACTOR and item_type == "dust":
+                mana = self.player.mana + MANA_REGEN_FROM_ITEM * int(items.stack[i])
+                self.player.mana = min(self.player.max_mana, mana)
+                consumed[i] = True
+            elif block is not None and block_type in MACHINE_TYPES:
+                machine = self.world.block_machine(block)
+                taken = machine.accept(item_type, int(items.stack[i]))
+                if not taken: continue
+                items.stack[i] -= taken
+                consumed[i] = items.stack[i] <= 0
+                fed.append((block, machine))
+
+        picked = items.attract(self.player.center_x, self.player.center_y) & ~consumed
+        if picked.any():
+            counts = np.bincount(items.kind[:len(items)][picked], weights=items.stack[:len(items)][picked],
+                                 minlength=len(items.type_names))
+            for type_id in np.flatnonzero(counts).tolist():
+                self.add_to_inventory(items.type_names[type_id], int(counts[type_id]))
+
+        picked |= consumed
+        if picked.any(): items.remove(picked)
+
+        for block, machine in fed:
+            self.spawn_machine_output(block, machine)
+            self.world.machine_changed(block)
+        items.merge()
+
+    def update_interactions(self, dt):
+        if arcade.check_for_collision_with_lists(self.player, self.world.layers["hazard"]):
+            if not self.is_dead:
+                self.is_dead = True
+                self.player.hp = 0
+
+        for block in arcade.check_for_collision_with_lists(self.player, self.world.layers["bouncy"]):
+            dx, dy = self.player.center_x - block.center_x, self.player.center_y - block.center_y
+            dist = max(0.1, math.hypot(dx, dy))
+            mult = 3.0 if getattr(block, 'block_type', '') == "reflector" and self.player.dash_timer > 0 else 1.0
+            self.player.change_x += (dx / dist) * IMPULSE_STRENGTH * 0.8 * mult
+            self.player.change_y += (dy / dist) * IMPULSE_STRENGTH * 0.8 * mult
+
+        if arcade.check_for_collision_with_lists(self.player, self.world.layers["acid"]):
+            self.player.mana -= 100 * dt
+            if self.hazard_tick(): self.take_damage(5)
+
+        self.player.on_biomass = len(arcade.check_for_collision_with_lists(self.player, self.world.layers["biomass"])) > 0
+
+        if arcade.check_for_collision_with_lists(self.player, self.world.layers["spikes"]):
+            if self.hazard_tick(): self.take_damage(15)
+
+        if arcade.check_for_collision_with_lists(self.player, self.world.layers["uranium"]):
+            self.uranium_timer += dt
+            if self.uranium_timer > 2.0 and self.hazard_tick():
+                self.take_damage(10)
+                self.player.mana -= 50
+        else:
+            self.uranium_timer = 0
+
+        # Аура батареи - квадрат 400x400 вокруг игрока, задетый спрайтом батареи
+        near_battery = self.world.any_block_near("battery", self.player.center_x, self.player.center_y,
+                                                 200 + SPRITE_PIXEL_SIZE / 2)
+        self.player.max_mana = MAX_MANA + 200 if near_battery else MAX_MANA
+        if self.player.mana > self.player.max_mana: self.player.mana = self.player.max_mana
+
+        self.current_interactable = self.world.nearest_block("interactables", self.player.center_x,
+                                                             self.player.center_y, 80)
+        self.show_interact_hint = self.current_interactable is not None
+
+    def hazard_tick(self):
+        """Урон от опасностей идет в первые 0.1 с каждой секунды - по счетчику шагов, а не по времени кадра"""
+        return self.sim_tick % SIM_RATE < SIM_RATE // 10
+
+    # --- Действия игрока (их вызывают обработчики ввода GameView или сценарий) ---
+
+    def dash_to(self, world_x, world_y):
+        if self.player.mana >= DASH_MANA_COST and not self.player.on_biomass:
+            self.player.mana -= DASH_MANA_COST
+            self.player.apply_impulse(world_x, world_y)
+
+    def use_selected_at(self, world_x, world_y):
+        """Предмет из выбранной ячейки по точке мира: колба, установка блока или добыча"""
+        if math.hypot(self.player.center_x - world_x, self.player.center_y - world_y) > 300: return
+
+        selected = self.slot_contents[self.selected_slot_index]
+
+        if selected == "acid_flask" and self.player.inventory.get("acid_flask", 0) > 0:
+            self.player.mana = min(self.player.max_mana, self.player.mana + 100)
+            self.remove_from_inventory("acid_flask", 1)
+            return
+
+        machine_blocks = ["metal2_block", "furnace", "assembler", "teleporter", "extractor", "press",
+                          "titanium_block", "glass_block", "chem_lab", "battery", "reflector", "chest"]
+
+        wx, wy = int(world_x // SPRITE_PIXEL_SIZE), int(world_y // SPRITE_PIXEL_SIZE)
+        target_type, target_block = self.world.block_at(wx, wy)
+
+        if selected in machine_blocks and self.player.inventory.get(selected, 0) > 0:
+            if target_type not in HITTABLE_BLOCKS:
+                b = BLOCK_METAL2
+                if selected == "furnace":
+                    b = BLOCK_FURNACE
+                elif selected == "assembler":
+                    b = BLOCK_ASSEMBLER
+                elif selected == "teleporter":
+                    b = BLOCK_TELEPORTER
+                elif selected == "extractor":
+                    b = BLOCK_EXTRACTOR
+                elif selected == "press":
+                    b = BLOCK_PRESS
+                elif selected == "chest":
+                    b = BLOCK_CHEST
+                elif selected == "titanium_block":
+                    b = BLOCK_TITANIUM
+                elif selected == "glass_block":
+                    b = BLOCK_GLASS
+                elif selected == "chem_lab":
+                    b = BLOCK_CHEM_LAB
+                elif selected == "battery":
+                    b = BLOCK_BATTERY
+                elif selected == "reflector":
+                    b = BLOCK_REFLECTOR
+
+                self.world.add_block(wx, wy, b)
+                self.remove_from_inventory(selected, 1)
+            return
+
+        if target_type not in HITTABLE_BLOCKS or target_block is None: return
+
+        blocks_to_process = [(target_type, target_block)]
+        if selected == "quantum_drill" and target_type not in UNBREAKABLE_BLOCKS:
+            for dx, dy in [(0, 1), (0, -1), (1, 0), (-1, 0)]:
+                block_type, block = self.world.block_at(wx + dx, wy + dy)
+                if block_type in HITTABLE_BLOCKS and block is not None:
+                    blocks_to_process.append((block_type, block))
+
+        for block_type, block in blocks_to_process:
+            if block_type in UNBREAKABLE_BLOCKS:
+                if selected in ("pickaxe", "quantum_drill"):
+                    if block_type == BLOCK_MONOLITH: continue
+                    self.world.remove_block(block)
+                    self.particles.emit(block.center_x, block.center_y, (80, 20, 20, 100), 5)
+                continue
+
+            if block_type in INTERACTABLE_BLOCKS:
+                if selected in ("pickaxe", "quantum_drill"):
+                    self.eject_items(block)
+                    self.world.remove_block(block)
+                    t = getattr(block, 'block_type', '')
+                    if t in ("teleporter", "furnace", "assembler", "extractor", "press", "chem_lab", "battery",
+                             "reflector", "chest"):
+                        self.spawn_item(t, block.center_x, block.center_y)
+                continue
+
+            if block_type in HARD_BLOCKS and selected not in ("pickaxe", "quantum_drill"):
+                continue
+
+            if block_type == BLOCK_COPPER_ORE:
+                if random.random() < COPPER_DROP_CHANCE: self.spawn_item("copper", block.center_x, block.center_y)
+            elif block_type == BLOCK_TITANIUM_ORE:
+                self.spawn_item("titanium_ore", block.center_x, block.center_y)
+            elif block_type == BLOCK_URANIUM_ORE:
+                self.spawn_item("uranium_ore", block.center_x, block.center_y)
+            elif block_type == BLOCK_SHROOM:
+                self.spawn_item("spore", block.center_x, block.center_y)
+            elif block_type in METAL_BLOCKS:
+                if random.random() < 0.8: self.spawn_item("scrap", block.center_x, block.center_y)
+            elif block_type in FRAGILE_BLOCKS:
+                if random.random() < SHARD_DROP_CHANCE: self.spawn_item("shard", block.center_x, block.center_y)
+            elif block_type in WALL_BLOCKS and random.random() < 0.3:
+                self.spawn_item("dust", block.center_x, block.center_y)
+
+            self.world.remove_block(block)
+            self.particles.emit(block.center_x, block.center_y, (100, 100, 100, 100), 5)
+
+    def jump(self):
+        if self.physics_engine.can_jump(): self.player.change_y = PLAYER_JUMP_SPEED
+
+    def interact(self):
+        """Телепорт открывает меню, остальные механизмы выбрасывают содержимое"""
+        if not (self.show_interact_hint and self.current_interactable): return
+        if getattr(self.current_interactable, 'block_type', '') == "teleporter":
+            self.show_teleport_menu = True
+        else:
+            self.eject_items(self.current_interactable)
+
+    def throw_selected(self):
+        item = self.slot_contents[self.selected_slot_index]
+        if item and self.remove_from_inventory(item, 1):
+            self.spawn_item(item, self.player.center_x, self.player.center_y + 10, is_thrown=True,
+                            direction=1 if self.player.facing_right else -1)
+
+    def teleport_home(self):
+        self.player.center_x, self.player.center_y = self.player.start_x, self.player.start_y
+        self.show_teleport_menu = False
+
+    def respawn(self):
+        self.player.respawn()
+        self.player.left_pressed = False
+        self.player.right_pressed = False
+        self.is_dead = False
+        self.save_game()
+
+
+def main():
+    """Прогон симуляции без окна: игрок идет вправо через чанки, шаги считаются так быстро, как можно.
+    Сохранения пишутся во временную папку. Запуск из корня проекта: python -m core.sim [секунд игры]"""
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 60.0
+    with tempfile.TemporaryDirectory() as save_dir:
+        sim = GameSimulation(save_dir)
+        sim.reset()
+        sim.player.right_pressed = True
+        steps = int(seconds * SIM_RATE)
+        start = time.perf_counter()
+        for _ in range(steps): sim.step_simulation(SIM_DT)
+        elapsed = time.perf_counter() - start
+        sim.world.close()
+
+    print(f"Шагов: {steps} за {elapsed:.2f} с: {steps / elapsed:.0f} шагов/с, x{seconds / elapsed:.1f} к реальному времени")
+    print(f"Игрок: ({sim.player.center_x:.0f}, {sim.player.center_y:.0f}), чанков: {len(sim.world.active_chunks)}")
+    print(f"Счетчики чанков: {sim.world.chunk_stats}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+import numpy as np
+
+from .constants import *
+
+_MASK_64 = 0xFFFFFFFFFFFFFFFF
+
+# Пороги случайного числа -> тип блока (первый порог, который больше rand)
+_SURFACE_THRESHOLDS = np.array([0.05, 0.08, 0.12, 0.17, 0.25, 0.40])
+_SURFACE_BLOCKS = np.array([BLOCK_FRAGILE, BLOCK_BOUNCY, BLOCK_HAZARD, BLOCK_COPPER_ORE, BLOCK_METAL, BLOCK_DUST,
+                            BLOCK_QUANTUM], dtype=np.uint8)
+
+_DEEP_THRESHOLDS = np.array([0.01, 0.02, 0.04, 0.06, 0.10, 0.14, 0.18, 0.25])
+_DEEP_BLOCKS = np.array([BLOCK_TERMINAL, BLOCK_MONOLITH, BLOCK_URANIUM_ORE, BLOCK_SHROOM, BLOCK_BIOMASS, BLOCK_GEYSER,
+                         BLOCK_SPIKES, BLOCK_TITANIUM_ORE, BLOCK_DEEP_SLATE], dtype=np.uint8)
+
+# Стартовый алтарь: (wx, wy) -> блок
+_SPAWN_MACHINES = {(0, 3): BLOCK_EXTRACTOR, (-2, 3): BLOCK_TELEPORTER, (2, 3): BLOCK_PRESS, (4, 3): BLOCK_ASSEMBLER}
+
+
+def _splitmix64(z):
+    z = z + np.uint64(0x9E3779B97F4A7C15)
+    z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return z ^ (z >> np.uint64(31))
+
+
+def cell_random(wx, wy, seed=WORLD_SEED):
+    """Счетный (counter-based) ГСЧ: равномерное число [0, 1) для каждой клетки, без общего состояния"""
+    wx = np.asarray(wx, dtype=np.int64).astype(np.uint64)
+    wy = np.asarray(wy, dtype=np.int64).astype(np.uint64)
+    key = (wx << np.uint64(32)) ^ (wy & np.uint64(0xFFFFFFFF)) ^ np.uint64((seed * 0xD1B54A32D192ED03) & _MASK_64)
+    return (_splitmix64(key) >> np.uint64(11)) * (1.0 / (1 << 53))
+
+
+def generate_blocks(wx, wy):
+    """ID блоков для массивов мировых координат wx, wy (одинаковой формы)"""
+    wx = np.asarray(wx, dtype=np.int64)
+    wy = np.asarray(wy, dtype=np.int64)
+
+    noise = np.sin(wx * 0.2) * np.cos(wy * 0.2) + np.sin(wx * 0.05 + wy * 0.05)
+    rand = cell_random(wx, wy)
+
+    # Поверхность (Уровень 1)
+    surface = _SURFACE_BLOCKS[np.searchsorted(_SURFACE_THRESHOLDS, rand, side="right")]
+    surface[noise > 0.4] = BLOCK_EMPTY
+    surface[wy == 5] = BLOCK_DUST
+    surface[wy > 5] = BLOCK_EMPTY
+
+    # Квантовые Глубины (Уровень 2)
+    deep = _DEEP_BLOCKS[np.searchsorted(_DEEP_THRESHOLDS, rand, side="right")]
+    deep[(noise > 0.35) & (rand < 0.5)] = BLOCK_ACID
+    deep[noise > 0.4] = BLOCK_EMPTY
+
+    grid = np.where(wy < LEVEL_2_START_Y, deep, surface)
+    grid[(wy >= LEVEL_2_START_Y) & (wy <= LEVEL_2_START_Y + 2)] = BLOCK_CORE
+
+    spawn = (wx >= -7) & (wx <= 7) & (wy >= 1) & (wy <= 9)
+    if spawn.any():
+        grid[spawn] = BLOCK_EMPTY
+        grid[spawn & (wy <= 2) & (wx >= -5) & (wx <= 5)] = BLOCK_CORE
+        for (mx, my), block_type in _SPAWN_MACHINES.items():
+            grid[(wx == mx) & (wy == my)] = block_type
+    return grid
+
+
+def generate_chunk(cx, cy):
+    """Сетка ID блоков чанка формы (CHUNK_SIZE, CHUNK_SIZE), индексы [lx, ly]"""
+    local = np.arange(CHUNK_SIZE, dtype=np.int64)
+    wx, wy = np.meshgrid(cx * CHUNK_SIZE + local, cy * CHUNK_SIZE + local, indexing="ij")
+    return generate_blocks(wx, wy)
@@ -0,0 +1,36 @@
+import arcade
+import pyglet
+
+
+class TextLayer:
+    """Слой закэшированных надписей, которые рисуются одним пакетом pyglet.
+
+    Каждый кадр видимые надписи объявляются через show() по ключу. arcade.Text для ключа создается
+    один раз; раскладка пересчитывается, только если сменилась строка. draw() прячет надписи,
+    не объявленные в этом кадре, и рисует весь слой одним вызовом.
+    """
+
+    def __init__(self):
+        self.batch = pyglet.graphics.Batch()
+        self.labels = {}
+        self.visible = set()
+        self.shown = set()
+
+    def show(self, key, text, x, y, color=arcade.color.WHITE, font_size=12, **style):
+        """Показывает надпись в этом кадре. Стиль (размер, шрифт, якоря) задается при первом показе ключа"""
+        color = arcade.types.Color.from_iterable(color)
+        label = self.labels.get(key)
+        if label is None:
+            label = self.labels[key] = arcade.Text(text, x, y, color, font_size, batch=self.batch, **style)
+        else:
+            label.text = text
+            label.x = x
+            label.y = y
+            if label.color != color: label.color = color
+        self.shown.add(key)
+
+    def draw(self):
+        for key in self.visible - self.shown: self.labels[key].visible = False
+        for key in self.shown - self.visible: self.labels[key].visible = True
+        self.visible, self.shown = self.shown, set()
+        if self.visible: self.batch.draw()
@@ -0,0 +1,38 @@
+import heapq
+import itertools
+
+# Виды запланированных тиков блоков
+TICK_GEYSER = "geyser"
+TICK_DISSOLVE = "dissolve"
+
+
+class TickScheduler:
+    """Очередь запланированных тиков блоков: куча по времени срабатывания.
+
+    Любой тип блока может запланировать событие на клетку (выброс гейзера, растворение металла,
+    завершение работы механизма). За кадр обрабатываются только наступившие события, поэтому цена
+    кадра зависит от их числа, а не от числа загруженных блоков с таймерами. Отменять события не
+    нужно: владелец передает token и при срабатывании сам проверяет, актуально ли оно.
+    """
+
+    def __init__(self):
+        self.now = 0.0
+        self.heap = []
+        self._order = itertools.count()  # При равном времени - в порядке планирования
+
+    def __len__(self):
+        return len(self.heap)
+
+    def schedule(self, delay, kind, cell, token=None):
+        due = self.now + delay
+        heapq.heappush(self.heap, (due, next(self._order), kind, cell, token))
+        return due
+
+    def advance(self, dt):
+        """Сдвигает время и возвращает наступившие события: список (вид, клетка, token)"""
+        self.now += dt
+        fired = []
+        while self.heap and self.heap[0][0] <= self.now:
+            _, _, kind, cell, token = heapq.heappop(self.heap)
+            fired.append((kind, cell, token))
+        return fired
@@ -0,0 +1,77 @@
+from array import array
+
+from PIL import Image
+from arcade.gl import BufferDescription
+
+from .constants import *
+
+TILEMAP_VERTEX_SHADER = "assets/shaders/tilemap_vs.glsl"
+TILEMAP_FRAGMENT_SHADER = "assets/shaders/tilemap_fs.glsl"
+
+
+def build_block_atlas(block_textures):
+    """Атлас блоков: текстуры в один ряд, блок с ID n занимает n-ю ячейку. Ячейка 0 (пусто) прозрачна"""
+    count = max(block_textures) + 1
+    atlas = Image.new("RGBA", (SPRITE_PIXEL_SIZE * count, SPRITE_PIXEL_SIZE), (0, 0, 0, 0))
+    for block_type, texture in block_textures.items():
+        image = texture.image.convert("RGBA")
+        if image.size != (SPRITE_PIXEL_SIZE, SPRITE_PIXEL_SIZE):
+            image = image.resize((SPRITE_PIXEL_SIZE, SPRITE_PIXEL_SIZE), Image.NEAREST)
+        atlas.paste(image, (block_type * SPRITE_PIXEL_SIZE, 0))
+    # Строки OpenGL идут снизу вверх
+    return atlas.transpose(Image.FLIP_TOP_BOTTOM)
+
+
+class TileRenderer:
+    """Рисует блоки чанков без спрайтов: сетка ID каждого чанка лежит в маленькой целочисленной
+    текстуре, и весь чанк рисуется одним квадом с шейдером, который берет пиксели из атласа."""
+
+    def __init__(self, ctx, block_textures):
+        self.ctx = ctx
+        self.program = ctx.load_program(vertex_shader=TILEMAP_VERTEX_SHADER,
+                                        fragment_shader=TILEMAP_FRAGMENT_SHADER)
+        self.program["tiles"] = 0
+        self.program["atlas"] = 1
+        self.program["chunk_size"] = CHUNK_SIZE
+        self.program["tile_px"] = SPRITE_PIXEL_SIZE
+        self.program["chunk_px"] = CHUNK_SIZE * SPRITE_PIXEL_SIZE
+
+        atlas = build_block_atlas(block_textures)
+        self.atlas = ctx.texture(atlas.size, components=4, data=atlas.tobytes(),
+                                 filter=(ctx.NEAREST, ctx.NEAREST))
+
+        quad = ctx.buffer(data=array("f", [0, 0, 1, 0, 0, 1, 1, 1]))
+        self.geometry = ctx.geometry([BufferDescription(quad, "2f", ["in_pos"])], mode=ctx.TRIANGLE_STRIP)
+
+        self.chunk_textures = {}  # (cx, cy) -> [чанк, текстура, версия сетки]
+
+    def _chunk_texture(self, key, chunk):
+        entry = self.chunk_textures.get(key)
+        if entry is None or entry[0] is not chunk:
+            # Сетка [lx, ly] транспонируется, чтобы строки текстуры шли по ly
+            texture = self.ctx.texture((CHUNK_SIZE, CHUNK_SIZE), components=1, dtype="u1",
+                                       data=chunk.blocks.T.tobytes(), filter=(self.ctx.NEAREST, self.ctx.NEAREST))
+            entry = [chunk, texture, chunk.grid_version]
+            self.chunk_textures[key] = entry
+        elif entry[2] != chunk.grid_version:
+            entry[1].write(chunk.blocks.T.tobytes())
+            entry[2] = chunk.grid_version
+        return entry[1]
+
+    def draw(self, chunks, left, bottom, right, top):
+        """Рисует видимые чанки из словаря {(cx, cy): чанк}; текстуры ушедших чанков освобождаются"""
+        for key in [k for k, entry in self.chunk_textures.items() if chunks.get(k) is not entry[0]]:
+            self.chunk_textures.pop(key)[1].delete()
+
+        chunk_px = CHUNK_SIZE * SPRITE_PIXEL_SIZE
+        # Сначала заливаем текстуры (создание и запись текстуры меняют привязки юнитов), потом рисуем
+        visible = [((cx, cy), self._chunk_texture((cx, cy), chunk)) for (cx, cy), chunk in chunks.items()
+                   if cx * chunk_px < right and (cx + 1) * chunk_px > left
+                   and cy * chunk_px < top and (cy + 1) * chunk_px > bottom]
+
+        self.ctx.enable(self.ctx.BLEND)
+        self.atlas.use(1)
+        for (cx, cy), texture in visible:
+            texture.use(0)
+            self.program["origin"] = (cx * chunk_px, cy * chunk_px)
+            self.geometry.render(self.program)
@@ -1,6 +1,7 @@
 import arcade
 from .constants import *
 from .ui_panel import UIMainPanel
+from .text import TextLayer
 
 
 class GameUI:
@@ -15,7 +16,9 @@ class GameUI:
         tex_hp_bg = get_texture("assets/textures/ui_hp_bg.png", arcade.color.DARK_GRAY, size=200)
         tex_hp_fill = get_texture("assets/textures/ui_hp_fill.png", arcade.color.RED, size=200)
 
-        self.main_panel = UIMainPanel(tex_ui_slot, tex_energy_bg, tex_energy_fill, tex_hp_bg, tex_hp_fill)
+        self.text_layer = TextLayer()
+        self.main_panel = UIMainPanel(tex_ui_slot, tex_energy_bg, tex_energy_fill, tex_hp_bg, tex_hp_fill,
+                                      self.text_layer)
 
         self.hint_text = arcade.Text(
             text="[E] Взаимодействовать",
@@ -33,6 +36,7 @@ class GameUI:
         self.camera.use()
 
         self.main_panel.draw(player, selected_slot_index, slot_contents, self.item_textures)
+        self.text_layer.draw()
 
         if show_teleport_menu:
             arcade.draw_rect_filled(arcade.XYWH(window.width / 2, window.height / 2, window.width, window.height),
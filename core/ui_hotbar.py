@@ -4,10 +4,10 @@ from .ui_slot import UISlot
 
 
 class UIHotbarSlots:
-    def __init__(self, slot_count, spacing, bg_texture):
+    def __init__(self, slot_count, spacing, bg_texture, text_layer):
         self.slot_count = slot_count
         self.spacing = spacing
-        self.slots = [UISlot(bg_texture) for _ in range(slot_count)]
+        self.slots = [UISlot(bg_texture, text_layer, ("slot", i)) for i in range(slot_count)]
 
     @property
     def width(self):
@@ -6,8 +6,8 @@ from .ui_hp import UIHpBar
 
 
 class UIMainPanel:
-    def __init__(self, tex_ui_slot, tex_energy_bg, tex_energy_fill, tex_hp_bg, tex_hp_fill):
-        self.slots_panel = UIHotbarSlots(UI_HOTBAR_SLOTS, UI_SLOT_SPACING, tex_ui_slot)
+    def __init__(self, tex_ui_slot, tex_energy_bg, tex_energy_fill, tex_hp_bg, tex_hp_fill, text_layer):
+        self.slots_panel = UIHotbarSlots(UI_HOTBAR_SLOTS, UI_SLOT_SPACING, tex_ui_slot, text_layer)
         self.energy_bar = UIEnergyBar(tex_energy_bg, tex_energy_fill)
         self.hp_bar = UIHpBar(tex_hp_bg, tex_hp_fill)
 
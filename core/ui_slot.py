@@ -2,22 +2,12 @@ import arcade
 
 
 class UISlot:
-    """Класс отдельной ячейки инвентаря"""
+    """Класс отдельной ячейки инвентаря. Число предметов рисуется через общий слой надписей"""
 
-    def __init__(self, bg_texture):
+    def __init__(self, bg_texture, text_layer, key):
         self.bg_texture = bg_texture
-
-        self.count_text = arcade.Text(
-            text="",
-            x=0,
-            y=0,
-            color=arcade.color.WHITE,
-            font_size=14,
-            bold=True,
-            anchor_x="center",
-            anchor_y="center",
-            font_name=("Arial", "calibri")
-        )
+        self.text_layer = text_layer
+        self.key = key
 
     def draw(self, x, y, size, item_texture, count, is_selected):
         arcade.draw_texture_rect(self.bg_texture, arcade.XYWH(x, y, size, size))
@@ -36,7 +26,15 @@ class UISlot:
             arcade.draw_circle_filled(badge_x, badge_y, badge_radius, (20, 20, 20, 220))
             arcade.draw_circle_outline(badge_x, badge_y, badge_radius, arcade.color.GRAY, 1)
 
-            self.count_text.text = str(count)
-            self.count_text.x = badge_x
-            self.count_text.y = badge_y
-            self.count_text.draw()
\ No newline at end of file
+            self.text_layer.show(
+                self.key,
+                str(count),
+                badge_x,
+                badge_y,
+                color=arcade.color.WHITE,
+                font_size=14,
+                bold=True,
+                anchor_x="center",
+                anchor_y="center",
+                font_name=("Arial", "calibri")
+            )
\ No newline at end of file
@@ -1,9 +1,19 @@
 import arcade
+import math
+import numpy as np
 import random
 import os
-import json
-import math
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
 from .constants import *
+from .region import RegionStore, migrate_json_saves, cell_index
+from .terrain import generate_chunk
+from .machines import MACHINE_TYPES, new_machine
+from .acid import AcidContacts
+from .ticks import TickScheduler, TICK_GEYSER, TICK_DISSOLVE
+from .persist import BackgroundWriter
+from .journal import EditJournal
 
 
 def get_texture(filepath, fallback_color, size=SPRITE_PIXEL_SIZE):
@@ -12,100 +22,218 @@ def get_texture(filepath, fallback_color, size=SPRITE_PIXEL_SIZE):
     return arcade.make_soft_square_texture(size, fallback_color, outer_alpha=255)
 
 
+MACHINE_BLOCK_IDS = np.array(list(MACHINE_TYPES), dtype=np.uint8)
+
+
+# В какие списки спрайтов мира попадает блок каждого типа
+BLOCK_LAYERS = {
+    BLOCK_CORE: ("wall",), BLOCK_QUANTUM: ("wall",), BLOCK_DEEP_SLATE: ("wall",),
+    BLOCK_TITANIUM: ("wall",), BLOCK_GLASS: ("wall",),
+    BLOCK_FRAGILE: ("fragile",), BLOCK_SHROOM: ("fragile",),
+    BLOCK_BOUNCY: ("bouncy",), BLOCK_REFLECTOR: ("bouncy",),
+    BLOCK_HAZARD: ("hazard",),
+    BLOCK_METAL: ("metal",), BLOCK_METAL2: ("metal",), BLOCK_COPPER_ORE: ("metal",), BLOCK_TITANIUM_ORE: ("metal",),
+    BLOCK_DUST: ("dust",),
+    BLOCK_ACID: ("acid",),
+    BLOCK_BIOMASS: ("biomass",),
+    BLOCK_URANIUM_ORE: ("uranium", "wall"),
+    BLOCK_SPIKES: ("spikes",),
+    BLOCK_GEYSER: ("geyser", "wall"),
+    BLOCK_MONOLITH: ("monolith", "wall"),
+    BLOCK_BATTERY: ("battery", "interactables", "wall"),
+    BLOCK_EXTRACTOR: ("interactables",), BLOCK_TELEPORTER: ("interactables",), BLOCK_PRESS: ("interactables",),
+    BLOCK_FURNACE: ("interactables",), BLOCK_ASSEMBLER: ("interactables",), BLOCK_CHEST: ("interactables",),
+    BLOCK_TERMINAL: ("interactables",), BLOCK_CHEM_LAB: ("interactables",),
+}
+
+# Имена механизмов и особых блоков (sprite.block_type)
+BLOCK_TYPE_NAMES = {
+    BLOCK_EXTRACTOR: "extractor", BLOCK_TELEPORTER: "teleporter", BLOCK_PRESS: "press", BLOCK_FURNACE: "furnace",
+    BLOCK_ASSEMBLER: "assembler", BLOCK_CHEST: "chest", BLOCK_TERMINAL: "terminal", BLOCK_CHEM_LAB: "chem_lab",
+    BLOCK_BATTERY: "battery", BLOCK_REFLECTOR: "reflector",
+}
+
+
+BLOCK_LAYER_NAMES = ("acid", "biomass", "uranium", "spikes", "geyser", "monolith", "interactables",
+                     "wall", "metal", "dust", "fragile", "bouncy", "hazard", "battery")
+# Слои, через которые не проходят игрок и предметы
+SOLID_LAYERS = ("wall", "fragile", "metal", "dust")
+# Слои, по которым ищут перебором, а не через пространственный хэш
+UNHASHED_LAYERS = ("geyser", "battery")
+
+
+def blocks_in_layers(*layers):
+    return frozenset(b for b, block_layers in BLOCK_LAYERS.items() if any(l in block_layers for l in layers))
+
+
+def block_lut(blocks):
+    """Таблица ID -> bool для векторных проверок по сетке блоков"""
+    lut = np.zeros(256, dtype=bool)
+    lut[list(blocks)] = True
+    return lut
+
+
+WALL_BLOCKS = blocks_in_layers("wall")
+SOLID_BLOCKS = blocks_in_layers(*SOLID_LAYERS)
+METAL_BLOCKS = blocks_in_layers("metal")
+FRAGILE_BLOCKS = blocks_in_layers("fragile")
+INTERACTABLE_BLOCKS = blocks_in_layers("interactables")
+# Блоки, которые можно ломать правой кнопкой и которые занимают клетку при установке
+HITTABLE_BLOCKS = blocks_in_layers("wall", "fragile", "metal", "dust", "interactables", "biomass", "spikes")
+UNBREAKABLE_BLOCKS = frozenset((BLOCK_CORE, BLOCK_MONOLITH))
+HARD_BLOCKS = frozenset((BLOCK_DEEP_SLATE, BLOCK_TITANIUM_ORE, BLOCK_URANIUM_ORE, BLOCK_TITANIUM, BLOCK_GLASS))
+# Слои с индексом клеток в каждом чанке для запросов "ближайший блок слоя рядом с точкой"
+INDEXED_LAYERS = ("interactables", "battery")
+INDEXED_LAYER_LUTS = {layer: block_lut(blocks_in_layers(layer)) for layer in INDEXED_LAYERS}
+
+
 class Chunk:
+    """Данные чанка: сетка ID блоков [lx, ly] и разреженное хранилище механизмов по индексу клетки.
+    Спрайты - только представление, строятся из этих данных."""
+
     def __init__(self, cx, cy, world):
         self.cx = cx
         self.cy = cy
         self.world = world
-        self.blocks_data = {}
-        self.sprites = []
-        self.save_path = f"saves/chunk_{cx}_{cy}.json"
-
-    def generate_or_load(self):
-        if os.path.exists(self.save_path):
-            with open(self.save_path, "r") as f:
-                raw_data = json.load(f)
-
-            for key, val in raw_data.items():
-                if isinstance(val, dict):
-                    self.blocks_data[key] = val
-                else:
-                    self.blocks_data[key] = {"type": val, "meta": {}}
+        self.blocks = np.zeros((CHUNK_SIZE, CHUNK_SIZE), dtype=np.uint8)
+        self.machines = {}  # Индекс клетки -> состояние механизма (Machine)
+        self.cells = {layer: set() for layer in INDEXED_LAYERS}  # Слой -> индексы клеток с блоками этого слоя
+        self.sprites = {}
+        self.layers = {}  # Имя слоя -> SpriteList спрайтов этого чанка
+        self.sprites_built = False
+        self.attached = False
+        self.dirty = False  # Блоки или мета-данные изменились с момента загрузки
+        self.attach_epoch = 0  # Растет при каждом подключении: тики прошлых подключений устаревают
+        self.grid_version = 0  # Растет при каждом изменении сетки (TileRenderer перезаливает текстуру)
+
+    def mark_dirty(self):
+        self.dirty = True
+
+    def get_block(self, lx, ly):
+        return int(self.blocks[lx, ly])
+
+    def set_block(self, lx, ly, block_type, saved_meta=None):
+        self.blocks[lx, ly] = block_type
+        self.grid_version += 1
+        self.world.journal.block_set(self.cx * CHUNK_SIZE + lx, self.cy * CHUNK_SIZE + ly, block_type)
+        idx = cell_index(lx, ly)
+        for layer, cells in self.cells.items():
+            if INDEXED_LAYER_LUTS[layer][block_type]:
+                cells.add(idx)
+            else:
+                cells.discard(idx)
+        machine = new_machine(block_type, saved_meta)
+        if machine is not None:
+            self.machines[idx] = machine
+        else:
+            self.machines.pop(idx, None)
+        self.mark_dirty()
+
+    def machine_at(self, lx, ly):
+        return self.machines.get(cell_index(lx, ly))
+
+    def load_data(self):
+        """Чтение или генерация данных чанка. Безопасно вызывать из фонового потока"""
+        saved = self.world.regions.load(self.cx, self.cy)
+        if saved is not None:
+            grid, meta = saved
+            self.blocks = np.frombuffer(grid, dtype=np.uint8).reshape(CHUNK_SIZE, CHUNK_SIZE).copy()
         else:
-            for lx in range(CHUNK_SIZE):
-                for ly in range(CHUNK_SIZE):
-                    wx = self.cx * CHUNK_SIZE + lx
-                    wy = self.cy * CHUNK_SIZE + ly
-                    block_type = self.world.get_default_block(wx, wy)
-                    self.blocks_data[f"{lx}_{ly}"] = {"type": block_type, "meta": {}}
-
-        for key, data in self.blocks_data.items():
-            block_type = data.get("type", BLOCK_EMPTY)
-            meta = data.get("meta", {})
-            if block_type == BLOCK_EMPTY: continue
-
-            lx, ly = map(int, key.split('_'))
+            self.blocks, meta = generate_chunk(self.cx, self.cy), {}
+
+        flat = self.blocks.ravel()
+        self.machines = {idx: new_machine(int(flat[idx]), meta.get(idx))
+                         for idx in np.flatnonzero(np.isin(flat, MACHINE_BLOCK_IDS)).tolist()}
+        self.cells = {layer: set(np.flatnonzero(lut[flat]).tolist()) for layer, lut in INDEXED_LAYER_LUTS.items()}
+
+    def build_sprites(self):
+        """Создает спрайты блоков, не добавляя их в списки мира. Безопасно вызывать из фонового потока"""
+        for lx, ly in zip(*np.nonzero(self.blocks)):
+            lx, ly = int(lx), int(ly)
             wx = self.cx * CHUNK_SIZE + lx
             wy = self.cy * CHUNK_SIZE + ly
-            self.world._create_sprite_for_block(self, wx, wy, lx, ly, block_type, meta)
+            self.world._create_sprite_for_block(self, wx, wy, lx, ly, int(self.blocks[lx, ly]))
+        self.sprites_built = True
+        return self
+
+    def add_sprite(self, sprite):
+        """Кладет спрайт блока в списки слоев чанка (список слоя создается при первой надобности)"""
+        for layer in BLOCK_LAYERS.get(sprite.block_type_id, ()):
+            sprite_list = self.layers.get(layer)
+            if sprite_list is None:
+                # lazy: списки не рисуются (блоки рисует TileRenderer), буферы OpenGL им не нужны
+                sprite_list = arcade.SpriteList(use_spatial_hash=layer not in UNHASHED_LAYERS, lazy=True)
+                self.layers[layer] = sprite_list
+                if self.attached: self.world._attach_layer(layer, sprite_list)
+            sprite_list.append(sprite)
+
+    def drop_sprites(self):
+        """Освобождает спрайты выгруженного чанка, оставляя только данные"""
+        self.sprites = {}
+        self.layers = {}
+        self.sprites_built = False
+
+    def attach(self):
+        """Подключает списки слоев чанка к миру целиком. Только из основного потока"""
+        for layer, sprite_list in self.layers.items():
+            self.world._attach_layer(layer, sprite_list)
+        self.attached = True
+        self.attach_epoch += 1
+
+    def detach(self):
+        for layer, sprite_list in self.layers.items():
+            self.world._detach_layer(layer, sprite_list)
+        self.attached = False
 
     def save(self):
-        for sprite in self.sprites:
-            key = f"{sprite.lx}_{sprite.ly}"
-            if not hasattr(sprite, 'block_type'): continue
-
-            meta = {}
-            t = sprite.block_type
-            if t == "chest":
-                meta["inv"] = getattr(sprite, 'inventory', {})
-            elif t == "furnace":
-                meta["ore"] = getattr(sprite, 'ore_count', 0)
-                meta["en"] = getattr(sprite, 'energy_count', 0)
-                meta["ore_t"] = getattr(sprite, 'ore_type', "copper")
-            elif t == "press":
-                meta["sc"] = getattr(sprite, 'scrap_count', 0)
-                meta["du"] = getattr(sprite, 'dust_count', 0)
-                meta["sh"] = getattr(sprite, 'shard_count', 0)
-            elif t == "assembler":
-                meta["ld"] = getattr(sprite, 'items_loaded', [])
-            elif t == "chem_lab":
-                meta["sp"] = getattr(sprite, 'spore_count', 0)
-                meta["du"] = getattr(sprite, 'dust_count', 0)
-            elif t == "terminal":
-                meta["ur"] = getattr(sprite, 'uranium_count', 0)
-
-            if key in self.blocks_data:
-                self.blocks_data[key]["meta"] = meta
-
-        with open(self.save_path, "w") as f:
-            json.dump(self.blocks_data, f)
+        """Снимок чанка в очередь записи, только если он изменился. Возвращает True, если снимок сделан.
+        Снимок - копия сетки и мета механизмов, на диск его пишет фоновый поток мира"""
+        stats = self.world.chunk_stats
+        if not self.dirty:
+            stats["saves_skipped"] += 1
+            return False
+
+        meta = {idx: machine.to_meta() for idx, machine in self.machines.items()}
+        regions = self.world.regions
+        regions.save_later(self.cx, self.cy, self.blocks.tobytes(), meta)
+        self.world.journal.depends_on(self.world.writer.submit(regions.write_pending, self.cx, self.cy))
+        self.dirty = False
+        stats["saves"] += 1
+        return True
 
     def unload(self):
         self.save()
-        for sprite in self.sprites:
-            sprite.remove_from_sprite_lists()
+        self.world.chunk_stats["unloads"] += 1
+        self.detach()
 
 
 class World:
-    def __init__(self):
-        self.wall_list = arcade.SpriteList(use_spatial_hash=True)
-        self.fragile_list = arcade.SpriteList(use_spatial_hash=True)
-        self.bouncy_list = arcade.SpriteList(use_spatial_hash=True)
-        self.hazard_list = arcade.SpriteList(use_spatial_hash=True)
-        self.metal_list = arcade.SpriteList(use_spatial_hash=True)
-        self.dust_list = arcade.SpriteList(use_spatial_hash=True)
-        self.interactables_list = arcade.SpriteList(use_spatial_hash=True)
-
-        self.acid_list = arcade.SpriteList(use_spatial_hash=True)
-        self.biomass_list = arcade.SpriteList(use_spatial_hash=True)
-        self.uranium_list = arcade.SpriteList(use_spatial_hash=True)
-        self.geyser_list = arcade.SpriteList()
-        self.spikes_list = arcade.SpriteList(use_spatial_hash=True)
-        self.monolith_list = arcade.SpriteList(use_spatial_hash=True)
-        self.battery_list = arcade.SpriteList()
+    def __init__(self, save_dir="saves"):
+        # Слой -> списки спрайтов подключенных чанков. Запросы столкновений идут сразу по всем
+        self.layers = {layer: [] for layer in BLOCK_LAYER_NAMES}
+        self.solid_lists = []
+        self.layers_version = 0  # Растет при каждом подключении/отключении списка слоя
 
         self.active_chunks = {}
-        os.makedirs("saves", exist_ok=True)
+        self.ready_chunks = {}
+        self.pending_chunks = {}
+        self.placeholders = {}
+        # Счетчики чанков: записано, пропущено (чанк не менялся), выгружено, попадания/промахи кэша
+        self.chunk_stats = {"saves": 0, "saves_skipped": 0, "unloads": 0, "cache_hits": 0, "cache_misses": 0}
+        self.chunk_cache = OrderedDict()
+        self.request_times = {}  # Чанк -> когда запрошен (perf_counter)
+        self.load_latencies = deque(maxlen=1024)  # Секунды от запроса чанка до готовности
+        self.placeholder_list = arcade.SpriteList()
+        self.loader = ThreadPoolExecutor(max_workers=CHUNK_LOAD_WORKERS, thread_name_prefix="chunk-loader")
+        self.writer = BackgroundWriter("chunk-writer")  # Запись снимков чанков и состояния игрока
+        self.ticks = TickScheduler()  # Запланированные тики блоков (гейзеры, растворение)
+        self.acid = AcidContacts(self)  # Металл, касающийся кислоты
+        self.regions = RegionStore(save_dir)
+        _, failed = migrate_json_saves(self.regions)
+        if failed: print(f"Не удалось перенести старых сохранений чанков: {failed} (файлы оставлены в {save_dir})")
+        # Правки, не попавшие в регионы до закрытия или падения прошлой игры, проигрываются до загрузки чанков
+        self.journal = EditJournal(save_dir, self.writer, self.regions)
+        self.journal.replay()
 
         self.tex_quantum = get_texture("assets/textures/block_quantum.png", COLOR_QUANTUM)
         self.tex_core = get_texture("assets/textures/block_core.png", COLOR_CORE)
@@ -152,151 +280,26 @@ class World:
         self.tex_item_acid_flask = get_texture("assets/textures/item_acid_flask.png", COLOR_ACID_FLASK, size=24)
         self.tex_item_quantum_drill = get_texture("assets/textures/item_quantum_drill.png", COLOR_DRILL, size=48)
 
-    def get_default_block(self, wx, wy):
-        if -7 <= wx <= 7 and 1 <= wy <= 9:
-            if 1 <= wy <= 2 and -5 <= wx <= 5: return BLOCK_CORE
-            if wx == 0 and wy == 3: return BLOCK_EXTRACTOR
-            if wx == -2 and wy == 3: return BLOCK_TELEPORTER
-            if wx == 2 and wy == 3: return BLOCK_PRESS
-            if wx == 4 and wy == 3: return BLOCK_ASSEMBLER
-            return BLOCK_EMPTY
-
-        if LEVEL_2_START_Y <= wy <= LEVEL_2_START_Y + 2: return BLOCK_CORE
-
-        random.seed(f"seed_{wx}_{wy}")
-        noise = math.sin(wx * 0.2) * math.cos(wy * 0.2) + math.sin(wx * 0.05 + wy * 0.05)
-
-        if wy < LEVEL_2_START_Y:
-            if noise > 0.4: return BLOCK_EMPTY
-            rand = random.random()
-            if noise > 0.35 and rand < 0.5: return BLOCK_ACID
-            if rand < 0.01:
-                return BLOCK_TERMINAL
-            elif rand < 0.02:
-                return BLOCK_MONOLITH
-            elif rand < 0.04:
-                return BLOCK_URANIUM_ORE
-            elif rand < 0.06:
-                return BLOCK_SHROOM
-            elif rand < 0.10:
-                return BLOCK_BIOMASS
-            elif rand < 0.14:
-                return BLOCK_GEYSER
-            elif rand < 0.18:
-                return BLOCK_SPIKES
-            elif rand < 0.25:
-                return BLOCK_TITANIUM_ORE
-            return BLOCK_DEEP_SLATE
-
-        if wy > 5: return BLOCK_EMPTY
-        if wy == 5: return BLOCK_DUST
-        if noise > 0.4: return BLOCK_EMPTY
-
-        rand = random.random()
-        if rand < 0.05:
-            return BLOCK_FRAGILE
-        elif rand < 0.08:
-            return BLOCK_BOUNCY
-        elif rand < 0.12:
-            return BLOCK_HAZARD
-        elif rand < 0.17:
-            return BLOCK_COPPER_ORE
-        elif rand < 0.25:
-            return BLOCK_METAL
-        elif rand < 0.40:
-            return BLOCK_DUST
-        return BLOCK_QUANTUM
-
-    def _create_sprite_for_block(self, chunk, wx, wy, lx, ly, block_type, meta=None):
-        if meta is None: meta = {}
-        sprite = arcade.Sprite()
+        # ID блока -> текстура (для спрайтов-прокси и атласа TileRenderer)
+        self.block_textures = {
+            BLOCK_QUANTUM: self.tex_quantum, BLOCK_CORE: self.tex_core, BLOCK_FRAGILE: self.tex_fragile,
+            BLOCK_BOUNCY: self.tex_bouncy, BLOCK_HAZARD: self.tex_hazard, BLOCK_METAL: self.tex_metal,
+            BLOCK_DUST: self.tex_dust, BLOCK_EXTRACTOR: self.tex_extractor, BLOCK_TELEPORTER: self.tex_teleporter,
+            BLOCK_PRESS: self.tex_press, BLOCK_METAL2: self.tex_metal2, BLOCK_COPPER_ORE: self.tex_copper_ore,
+            BLOCK_FURNACE: self.tex_furnace, BLOCK_ASSEMBLER: self.tex_assembler,
+            BLOCK_DEEP_SLATE: self.tex_deep_slate, BLOCK_TITANIUM_ORE: self.tex_titanium_ore,
+            BLOCK_URANIUM_ORE: self.tex_uranium_ore, BLOCK_ACID: self.tex_acid, BLOCK_SHROOM: self.tex_shroom,
+            BLOCK_BIOMASS: self.tex_biomass, BLOCK_SPIKES: self.tex_spikes, BLOCK_GEYSER: self.tex_geyser,
+            BLOCK_TITANIUM: self.tex_titanium, BLOCK_GLASS: self.tex_glass, BLOCK_MONOLITH: self.tex_monolith,
+            BLOCK_TERMINAL: self.tex_terminal, BLOCK_CHEM_LAB: self.tex_chem_lab, BLOCK_BATTERY: self.tex_battery,
+            BLOCK_REFLECTOR: self.tex_reflector, BLOCK_CHEST: self.tex_chest,
+        }
+
+    def _create_sprite_for_block(self, chunk, wx, wy, lx, ly, block_type):
+        """Спрайт блока - прокси для столкновений и логики, блоки рисует TileRenderer"""
+        sprite = arcade.Sprite(self.block_textures.get(block_type))
         sprite.block_type_id = block_type
-        sprite.dissolve_timer = 0.0
-
-        if block_type == BLOCK_CORE:
-            sprite.texture = self.tex_core
-        elif block_type == BLOCK_QUANTUM:
-            sprite.texture = self.tex_quantum
-        elif block_type == BLOCK_FRAGILE:
-            sprite.texture = self.tex_fragile
-        elif block_type == BLOCK_BOUNCY:
-            sprite.texture = self.tex_bouncy
-        elif block_type == BLOCK_HAZARD:
-            sprite.texture = self.tex_hazard
-        elif block_type == BLOCK_METAL:
-            sprite.texture = self.tex_metal
-        elif block_type == BLOCK_METAL2:
-            sprite.texture = self.tex_metal2
-        elif block_type == BLOCK_COPPER_ORE:
-            sprite.texture = self.tex_copper_ore
-        elif block_type == BLOCK_DUST:
-            sprite.texture = self.tex_dust
-
-        elif block_type == BLOCK_DEEP_SLATE:
-            sprite.texture = self.tex_deep_slate
-        elif block_type == BLOCK_TITANIUM_ORE:
-            sprite.texture = self.tex_titanium_ore
-        elif block_type == BLOCK_URANIUM_ORE:
-            sprite.texture = self.tex_uranium_ore
-        elif block_type == BLOCK_ACID:
-            sprite.texture = self.tex_acid
-        elif block_type == BLOCK_SHROOM:
-            sprite.texture = self.tex_shroom
-        elif block_type == BLOCK_BIOMASS:
-            sprite.texture = self.tex_biomass
-        elif block_type == BLOCK_SPIKES:
-            sprite.texture = self.tex_spikes
-        elif block_type == BLOCK_GEYSER:
-            sprite.texture = self.tex_geyser
-            sprite.timer = random.uniform(0, 3.0)
-        elif block_type == BLOCK_TITANIUM:
-            sprite.texture = self.tex_titanium
-        elif block_type == BLOCK_GLASS:
-            sprite.texture = self.tex_glass
-        elif block_type == BLOCK_MONOLITH:
-            sprite.texture = self.tex_monolith
-
-        elif block_type == BLOCK_EXTRACTOR:
-            sprite.texture = self.tex_extractor
-            sprite.block_type = "extractor"
-        elif block_type == BLOCK_TELEPORTER:
-            sprite.texture = self.tex_teleporter
-            sprite.block_type = "teleporter"
-        elif block_type == BLOCK_PRESS:
-            sprite.texture = self.tex_press
-            sprite.block_type = "press"
-            sprite.scrap_count = meta.get("sc", 0)
-            sprite.dust_count = meta.get("du", 0)
-            sprite.shard_count = meta.get("sh", 0)
-        elif block_type == BLOCK_FURNACE:
-            sprite.texture = self.tex_furnace
-            sprite.block_type = "furnace"
-            sprite.ore_count = meta.get("ore", 0)
-            sprite.energy_count = meta.get("en", 0)
-            sprite.ore_type = meta.get("ore_t", "copper")
-        elif block_type == BLOCK_ASSEMBLER:
-            sprite.texture = self.tex_assembler
-            sprite.block_type = "assembler"
-            sprite.items_loaded = meta.get("ld", [])
-        elif block_type == BLOCK_CHEST:
-            sprite.texture = self.tex_chest
-            sprite.block_type = "chest"
-            sprite.inventory = meta.get("inv", {})
-        elif block_type == BLOCK_TERMINAL:
-            sprite.texture = self.tex_terminal
-            sprite.block_type = "terminal"
-            sprite.uranium_count = meta.get("ur", 0)
-        elif block_type == BLOCK_CHEM_LAB:
-            sprite.texture = self.tex_chem_lab
-            sprite.block_type = "chem_lab"
-            sprite.spore_count = meta.get("sp", 0)
-            sprite.dust_count = meta.get("du", 0)
-        elif block_type == BLOCK_BATTERY:
-            sprite.texture = self.tex_battery
-            sprite.block_type = "battery"
-        elif block_type == BLOCK_REFLECTOR:
-            sprite.texture = self.tex_reflector
-            sprite.block_type = "reflector"
+        if block_type in BLOCK_TYPE_NAMES: sprite.block_type = BLOCK_TYPE_NAMES[block_type]
 
         sprite.center_x = wx * SPRITE_PIXEL_SIZE + SPRITE_PIXEL_SIZE / 2
         sprite.center_y = wy * SPRITE_PIXEL_SIZE + SPRITE_PIXEL_SIZE / 2
@@ -304,40 +307,23 @@ class World:
         sprite.lx = lx
         sprite.ly = ly
 
-        chunk.sprites.append(sprite)
-
-        if block_type in (BLOCK_CORE, BLOCK_QUANTUM, BLOCK_DEEP_SLATE, BLOCK_TITANIUM, BLOCK_GLASS):
-            self.wall_list.append(sprite)
-        elif block_type == BLOCK_FRAGILE:
-            self.fragile_list.append(sprite)
-        elif block_type in (BLOCK_BOUNCY, BLOCK_REFLECTOR):
-            self.bouncy_list.append(sprite)
-        elif block_type == BLOCK_HAZARD:
-            self.hazard_list.append(sprite)
-        elif block_type in (BLOCK_METAL, BLOCK_METAL2, BLOCK_COPPER_ORE, BLOCK_TITANIUM_ORE):
-            self.metal_list.append(sprite)
-        elif block_type == BLOCK_DUST:
-            self.dust_list.append(sprite)
-        elif block_type == BLOCK_ACID:
-            self.acid_list.append(sprite)
-        elif block_type == BLOCK_BIOMASS:
-            self.biomass_list.append(sprite)
-        elif block_type == BLOCK_URANIUM_ORE:
-            self.uranium_list.append(sprite); self.wall_list.append(sprite)
-        elif block_type == BLOCK_SPIKES:
-            self.spikes_list.append(sprite)
-        elif block_type == BLOCK_GEYSER:
-            self.geyser_list.append(sprite); self.wall_list.append(sprite)
-        elif block_type == BLOCK_MONOLITH:
-            self.monolith_list.append(sprite); self.wall_list.append(sprite)
-        elif block_type == BLOCK_BATTERY:
-            self.battery_list.append(sprite); self.interactables_list.append(sprite); self.wall_list.append(sprite)
-        elif block_type == BLOCK_SHROOM:
-            self.fragile_list.append(sprite)
-
-        elif block_type in (BLOCK_EXTRACTOR, BLOCK_TELEPORTER, BLOCK_PRESS, BLOCK_FURNACE, BLOCK_ASSEMBLER, BLOCK_CHEST,
-                            BLOCK_TERMINAL, BLOCK_CHEM_LAB):
-            self.interactables_list.append(sprite)
+        chunk.sprites[cell_index(lx, ly)] = sprite
+        chunk.add_sprite(sprite)
+        return sprite
+
+    def _attach_layer(self, layer, sprite_list):
+        self.layers[layer].append(sprite_list)
+        if layer in SOLID_LAYERS: self.solid_lists.append(sprite_list)
+        self.layers_version += 1
+
+    def _detach_layer(self, layer, sprite_list):
+        self.layers[layer].remove(sprite_list)
+        if layer in SOLID_LAYERS: self.solid_lists.remove(sprite_list)
+        self.layers_version += 1
+
+    def layer_sprites(self, layer):
+        """Все спрайты слоя во всех подключенных чанках (копия, можно удалять блоки по ходу)"""
+        return [sprite for sprite_list in self.layers[layer] for sprite in sprite_list]
 
     def add_block(self, wx, wy, block_type):
         cx, cy = int(wx // CHUNK_SIZE), int(wy // CHUNK_SIZE)
@@ -345,30 +331,270 @@ class World:
 
         if (cx, cy) in self.active_chunks:
             chunk = self.active_chunks[(cx, cy)]
-            chunk.blocks_data[f"{lx}_{ly}"] = {"type": block_type, "meta": {}}
-            self._create_sprite_for_block(chunk, wx, wy, lx, ly, block_type, {})
-
-    def update_chunks(self, player_x, player_y):
-        chunk_x = int(player_x // (CHUNK_SIZE * SPRITE_PIXEL_SIZE))
-        chunk_y = int(player_y // (CHUNK_SIZE * SPRITE_PIXEL_SIZE))
-
-        needed_chunks = set()
-        for dx in [-1, 0, 1]:
-            for dy in [-1, 0, 1]:
-                needed_chunks.add((chunk_x + dx, chunk_y + dy))
-
-        for (cx, cy) in list(self.active_chunks.keys()):
-            if (cx, cy) not in needed_chunks:
-                self.active_chunks[(cx, cy)].unload()
-                del self.active_chunks[(cx, cy)]
-
-        for (cx, cy) in needed_chunks:
-            if (cx, cy) not in self.active_chunks:
-                new_chunk = Chunk(cx, cy, self)
-                new_chunk.generate_or_load()
-                self.active_chunks[(cx, cy)] = new_chunk
+            old_sprite = chunk.sprites.get(cell_index(lx, ly))
+            if old_sprite is not None: old_sprite.remove_from_sprite_lists()
+            chunk.set_block(lx, ly, block_type)
+            self._create_sprite_for_block(chunk, wx, wy, lx, ly, block_type)
+            self.acid.refresh_around(wx, wy)
+
+    def block_at(self, wx, wy):
+        """(ID блока, спрайт) в клетке мира за O(1). Для незагруженных чанков - (BLOCK_EMPTY, None)"""
+        chunk = self.active_chunks.get((wx // CHUNK_SIZE, wy // CHUNK_SIZE))
+        if chunk is None: return BLOCK_EMPTY, None
+        lx, ly = wx % CHUNK_SIZE, wy % CHUNK_SIZE
+        return int(chunk.blocks[lx, ly]), chunk.sprites.get(cell_index(lx, ly))
+
+    def blocks_in_rect(self, wx0, wy0, wx1, wy1, block_ids=None):
+        """Непустые блоки в клетках [wx0..wx1] x [wy0..wy1]: список (wx, wy, ID, спрайт).
+        block_ids - необязательный фильтр по типам блоков."""
+        found = []
+        for wx in range(wx0, wx1 + 1):
+            for wy in range(wy0, wy1 + 1):
+                block_type, sprite = self.block_at(wx, wy)
+                if block_type == BLOCK_EMPTY: continue
+                if block_ids is None or block_type in block_ids:
+                    found.append((wx, wy, block_type, sprite))
+        return found
+
+    def grid_window(self, wx0, wy0, wx1, wy1):
+        """Окно ID блоков [x, y] по клеткам [wx0..wx1] x [wy0..wy1]; незагруженные чанки - пусто"""
+        grid = np.zeros((wx1 - wx0 + 1, wy1 - wy0 + 1), dtype=np.uint8)
+        for cx in range(wx0 // CHUNK_SIZE, wx1 // CHUNK_SIZE + 1):
+            for cy in range(wy0 // CHUNK_SIZE, wy1 // CHUNK_SIZE + 1):
+                chunk = self.active_chunks.get((cx, cy))
+                if chunk is None: continue
+                ox, oy = cx * CHUNK_SIZE, cy * CHUNK_SIZE
+                x0, y0 = max(wx0, ox), max(wy0, oy)
+                x1, y1 = min(wx1, ox + CHUNK_SIZE - 1), min(wy1, oy + CHUNK_SIZE - 1)
+                grid[x0 - wx0:x1 - wx0 + 1, y0 - wy0:y1 - wy0 + 1] = chunk.blocks[x0 - ox:x1 - ox + 1, y0 - oy:y1 - oy + 1]
+        return grid
+
+    def loaded_grid(self):
+        """Сетка ID блоков по прямоугольнику, охватывающему подключенные чанки: (сетка [x, y], wx0, wy0)"""
+        if not self.active_chunks: return np.zeros((0, 0), dtype=np.uint8), 0, 0
+        xs = [cx for cx, _ in self.active_chunks]
+        ys = [cy for _, cy in self.active_chunks]
+        wx0, wy0 = min(xs) * CHUNK_SIZE, min(ys) * CHUNK_SIZE
+        grid = self.grid_window(wx0, wy0, (max(xs) + 1) * CHUNK_SIZE - 1, (max(ys) + 1) * CHUNK_SIZE - 1)
+        return grid, wx0, wy0
+
+    def _schedule_geysers(self, chunk):
+        token = (chunk, chunk.attach_epoch)
+        for lx, ly in zip(*np.nonzero(chunk.blocks == BLOCK_GEYSER)):
+            cell = (chunk.cx * CHUNK_SIZE + int(lx), chunk.cy * CHUNK_SIZE + int(ly))
+            self.ticks.schedule(random.uniform(0, GEYSER_PERIOD), TICK_GEYSER, cell, token)
+
+    def update_ticks(self, dt):
+        """Наступившие тики блоков: список (вид, (wx, wy)). Устаревшие события отбрасываются,
+        гейзеры планируются на следующий выброс"""
+        fired = []
+        for kind, cell, token in self.ticks.advance(dt):
+            if kind == TICK_GEYSER:
+                chunk, epoch = token
+                if not chunk.attached or chunk.attach_epoch != epoch or self.block_at(*cell)[0] != BLOCK_GEYSER:
+                    continue
+                self.ticks.schedule(GEYSER_PERIOD, kind, cell, token)
+            elif kind == TICK_DISSOLVE and not self.acid.take_due(cell, token):
+                continue
+            fired.append((kind, cell))
+        return fired
+
+    def _refresh_chunk_area(self, key):
+        """Пересчет соседства с кислотой для чанка и клеток вокруг него"""
+        wx, wy = key[0] * CHUNK_SIZE, key[1] * CHUNK_SIZE
+        self.acid.refresh(wx - 1, wy - 1, wx + CHUNK_SIZE, wy + CHUNK_SIZE)
+
+    def indexed_blocks_near(self, layer, x, y, reach):
+        """Блоки индексированного слоя (INDEXED_LAYERS), центр которых не дальше reach от точки по каждой оси:
+        (спрайт, dx, dy). В каждом чанке, который задевает квадрат поиска, просматривается меньшее из двух:
+        клетки квадрата или клетки из индекса слоя - время ограничено размером квадрата, а не базы"""
+        wx0 = math.ceil((x - reach) / SPRITE_PIXEL_SIZE - 0.5)
+        wx1 = math.floor((x + reach) / SPRITE_PIXEL_SIZE - 0.5)
+        wy0 = math.ceil((y - reach) / SPRITE_PIXEL_SIZE - 0.5)
+        wy1 = math.floor((y + reach) / SPRITE_PIXEL_SIZE - 0.5)
+        for cx in range(wx0 // CHUNK_SIZE, wx1 // CHUNK_SIZE + 1):
+            for cy in range(wy0 // CHUNK_SIZE, wy1 // CHUNK_SIZE + 1):
+                chunk = self.active_chunks.get((cx, cy))
+                if chunk is None or not chunk.cells[layer]: continue
+                cells = chunk.cells[layer]
+                ox, oy = cx * CHUNK_SIZE, cy * CHUNK_SIZE
+                lx0, lx1 = max(wx0 - ox, 0), min(wx1 - ox, CHUNK_SIZE - 1)
+                ly0, ly1 = max(wy0 - oy, 0), min(wy1 - oy, CHUNK_SIZE - 1)
+                if len(cells) < (lx1 - lx0 + 1) * (ly1 - ly0 + 1):
+                    found = [idx for idx in cells
+                             if lx0 <= idx // CHUNK_SIZE <= lx1 and ly0 <= idx % CHUNK_SIZE <= ly1]
+                else:
+                    found = [cell_index(lx, ly) for lx in range(lx0, lx1 + 1) for ly in range(ly0, ly1 + 1)
+                             if cell_index(lx, ly) in cells]
+                for idx in found:
+                    sprite = chunk.sprites.get(idx)
+                    if sprite is None: continue
+                    yield sprite, sprite.center_x - x, sprite.center_y - y
+
+    def nearest_block(self, layer, x, y, radius):
+        """Ближайший к точке блок слоя, чей центр ближе radius, или None"""
+        best, best_dist = None, radius
+        for sprite, dx, dy in self.indexed_blocks_near(layer, x, y, radius):
+            dist = math.hypot(dx, dy)
+            if dist < best_dist: best, best_dist = sprite, dist
+        return best
+
+    def any_block_near(self, layer, x, y, reach):
+        return next(self.indexed_blocks_near(layer, x, y, reach), None) is not None
+
+    def machine_changed(self, sprite):
+        """Состояние механизма блока изменилось: чанк помечается измененным, новое состояние - в журнал"""
+        chunk = sprite.chunk
+        chunk.mark_dirty()
+        machine = chunk.machine_at(sprite.lx, sprite.ly)
+        if machine is not None:
+            self.journal.meta_set(chunk.cx * CHUNK_SIZE + sprite.lx, chunk.cy * CHUNK_SIZE + sprite.ly,
+                                  machine.to_meta())
+
+    def save_dirty(self):
+        """Снимок всех измененных чанков в очередь записи; журнал правок до этого момента больше не нужен"""
+        for chunk in self.active_chunks.values(): chunk.save()
+        self.journal.rotate()
+
+    def block_machine(self, sprite):
+        """Состояние механизма блока, которому соответствует спрайт (None, если блок не механизм)"""
+        return sprite.chunk.machine_at(sprite.lx, sprite.ly)
+
+    def close(self):
+        self.loader.shutdown(wait=True, cancel_futures=True)
+        self.writer.close()
+        self.journal.close()
+        self.pending_chunks.clear()
+        self.ready_chunks.clear()
+        self.chunk_cache.clear()
+        self.regions.close()
+
+    def _load_chunk(self, cx, cy):
+        chunk = Chunk(cx, cy, self)
+        chunk.load_data()
+        chunk.build_sprites()
+        return chunk
+
+    @staticmethod
+    def _chunk_ring(chunk_x, chunk_y, radius):
+        return {(chunk_x + dx, chunk_y + dy) for dx in range(-radius, radius + 1) for dy in range(-radius, radius + 1)}
+
+    def _cache_chunk(self, key, chunk):
+        """Кладет выгруженный чанк в LRU-кэш, соблюдая лимиты по числу чанков и спрайтов"""
+        self.chunk_cache[key] = chunk
+        self.chunk_cache.move_to_end(key)
+        while len(self.chunk_cache) > CHUNK_CACHE_SIZE:
+            self.chunk_cache.popitem(last=False)
+
+        cached_sprites = sum(len(c.sprites) for c in self.chunk_cache.values())
+        for cached in self.chunk_cache.values():
+            if cached_sprites <= CHUNK_CACHE_SPRITE_LIMIT: break
+            cached_sprites -= len(cached.sprites)
+            cached.drop_sprites()
+
+    def _chunk_ready(self, key, chunk):
+        requested = self.request_times.pop(key, None)
+        if requested is not None: self.load_latencies.append(time.perf_counter() - requested)
+        self.ready_chunks[key] = chunk
+
+    def _request_chunk(self, key):
+        self.request_times[key] = time.perf_counter()
+        cached = self.chunk_cache.pop(key, None)
+        if cached is None:
+            self.chunk_stats["cache_misses"] += 1
+            self.pending_chunks[key] = self.loader.submit(self._load_chunk, *key)
+        elif cached.sprites_built:
+            self.chunk_stats["cache_hits"] += 1
+            self._chunk_ready(key, cached)
+        else:
+            self.chunk_stats["cache_hits"] += 1
+            self.pending_chunks[key] = self.loader.submit(cached.build_sprites)
+
+    def _attach_chunk(self, key, chunk):
+        chunk.attach()
+        self.active_chunks[key] = chunk
+        self._refresh_chunk_area(key)
+        self._schedule_geysers(chunk)
+        placeholder = self.placeholders.pop(key, None)
+        if placeholder is not None: placeholder.remove_from_sprite_lists()
+
+    def update_chunks(self, player_x, player_y, velocity_x=0.0, velocity_y=0.0, wait=False):
+        """Подгрузка чанков вокруг игрока.
+
+        Данные и спрайты чанков готовятся в фоновых потоках (с упреждением по скорости игрока),
+        в основном потоке спрайты только добавляются в списки, не больше CHUNK_ATTACH_PER_FRAME
+        чанков за кадр. Пока соседний чанк не готов, на его месте рисуется заглушка. Ждем только
+        чанк, в котором стоит сам игрок (или все ближайшие при wait=True).
+
+        Загружаются чанки в радиусе CHUNK_LOAD_RADIUS, а выгружаются только дальше
+        CHUNK_UNLOAD_RADIUS. Выгруженные чанки попадают в LRU-кэш, повторный вход в них
+        обходится без диска и генерации.
+        """
+        chunk_px = CHUNK_SIZE * SPRITE_PIXEL_SIZE
+        chunk_x = int(player_x // chunk_px)
+        chunk_y = int(player_y // chunk_px)
+        current = (chunk_x, chunk_y)
+
+        needed_chunks = self._chunk_ring(chunk_x, chunk_y, CHUNK_LOAD_RADIUS)
+        ahead_x = int((player_x + velocity_x * CHUNK_PREFETCH_FRAMES) // chunk_px)
+        ahead_y = int((player_y + velocity_y * CHUNK_PREFETCH_FRAMES) // chunk_px)
+        wanted_chunks = needed_chunks | self._chunk_ring(ahead_x, ahead_y, CHUNK_LOAD_RADIUS)
+
+        for key in list(self.active_chunks.keys()):
+            far = max(abs(key[0] - chunk_x), abs(key[1] - chunk_y)) > CHUNK_UNLOAD_RADIUS
+            if far and key not in wanted_chunks:
+                chunk = self.active_chunks.pop(key)
+                chunk.unload()
+                self._refresh_chunk_area(key)
+                self._cache_chunk(key, chunk)
+
+        for key in list(self.ready_chunks.keys()):
+            if key not in wanted_chunks:
+                self._cache_chunk(key, self.ready_chunks.pop(key))
+
+        for key, future in list(self.pending_chunks.items()):
+            if future.done():
+                del self.pending_chunks[key]
+                if key in wanted_chunks:
+                    self._chunk_ready(key, future.result())
+                else:
+                    self.request_times.pop(key, None)
+                    self._cache_chunk(key, future.result())
+            elif key not in wanted_chunks and future.cancel():
+                del self.pending_chunks[key]
+                self.request_times.pop(key, None)
+
+        for key in wanted_chunks:
+            if key not in self.active_chunks and key not in self.ready_chunks and key not in self.pending_chunks:
+                self._request_chunk(key)
+
+        must_have = needed_chunks if wait else {current}
+        for key in must_have:
+            if key in self.pending_chunks:
+                self._chunk_ready(key, self.pending_chunks.pop(key).result())
+
+        attached = 0
+        for key in sorted(needed_chunks, key=lambda k: abs(k[0] - chunk_x) + abs(k[1] - chunk_y)):
+            if key in self.active_chunks or key not in self.ready_chunks: continue
+            if key in must_have or attached < CHUNK_ATTACH_PER_FRAME:
+                self._attach_chunk(key, self.ready_chunks.pop(key))
+                attached += 1
+
+        for key in needed_chunks:
+            if key not in self.active_chunks and key not in self.placeholders:
+                placeholder = arcade.SpriteSolidColor(chunk_px, chunk_px, color=COLOR_CHUNK_PLACEHOLDER)
+                placeholder.center_x = key[0] * chunk_px + chunk_px / 2
+                placeholder.center_y = key[1] * chunk_px + chunk_px / 2
+                self.placeholders[key] = placeholder
+                self.placeholder_list.append(placeholder)
+
+        for key in list(self.placeholders.keys()):
+            if key not in needed_chunks:
+                self.placeholders.pop(key).remove_from_sprite_lists()
 
     def remove_block(self, sprite):
         chunk = sprite.chunk
-        chunk.blocks_data[f"{sprite.lx}_{sprite.ly}"] = {"type": BLOCK_EMPTY, "meta": {}}
-        sprite.remove_from_sprite_lists()
\ No newline at end of file
+        chunk.set_block(sprite.lx, sprite.ly, BLOCK_EMPTY)
+        chunk.sprites.pop(cell_index(sprite.lx, sprite.ly), None)
+        sprite.remove_from_sprite_lists()
+        self.acid.refresh_around(chunk.cx * CHUNK_SIZE + sprite.lx, chunk.cy * CHUNK_SIZE + sprite.ly)
\ No newline at end of file
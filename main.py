@@ -1,5 +1,5 @@
 import arcade
-from core.constants import SCREEN_WIDTH, SCREEN_HEIGHT, SCREEN_TITLE
+from core.constants import SCREEN_WIDTH, SCREEN_HEIGHT, SCREEN_TITLE, RENDER_RATE
 from core.menu import MainMenu
 from core.music import MusicManager
 
@@ -8,7 +8,8 @@ class GameWindow(arcade.Window):
     """Кастомное окно игры для глобального управления музыкой"""
 
     def __init__(self):
-        super().__init__(SCREEN_WIDTH, SCREEN_HEIGHT, SCREEN_TITLE, resizable=True)
+        super().__init__(SCREEN_WIDTH, SCREEN_HEIGHT, SCREEN_TITLE, resizable=True,
+                         update_rate=1 / RENDER_RATE, draw_rate=1 / RENDER_RATE)
 
         self.music_manager = MusicManager("assets/music")
         self.music_manager.play_next()
@@ -18,6 +19,12 @@ class GameWindow(arcade.Window):
 
         super().on_update(delta_time)
 
+    def on_close(self):
+        # Закрытие окна во время игры - то же, что "Сохранить и выйти": отложенные записи сбрасываются на диск
+        close_game = getattr(self.current_view, "close", None)
+        if close_game: close_game()
+        super().on_close()
+
 
 def main():
     window = GameWindow()
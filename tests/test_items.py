@@ -0,0 +1,59 @@
+import numpy as np
+
+from core.constants import MAX_DROPPED_ITEMS
+from core.items import DroppedItems, ITEM_MERGE_RADIUS
+
+
+def total(items):
+    return int(items.stack[:len(items)].sum())
+
+
+def fill_budget(items):
+    """Заполняет бюджет стопками, которые не сливаются друг с другом (разные клетки слияния)"""
+    kinds = ("dust", "scrap", "shard", "copper")
+    for i in range(MAX_DROPPED_ITEMS):
+        items.spawn(kinds[i % len(kinds)], i * ITEM_MERGE_RADIUS * 2, 0, 0, 0, count=3)
+    assert len(items) == MAX_DROPPED_ITEMS
+    return 3 * MAX_DROPPED_ITEMS
+
+
+def test_budget_never_destroys_items():
+    items = DroppedItems()
+    spawned = fill_budget(items)
+
+    # Тип с лежащими стопками - докладывается в ближайшую, новых стопок нет
+    items.spawn("dust", 5, 5, 0, 0, count=10)
+    spawned += 10
+    assert len(items) == MAX_DROPPED_ITEMS
+    assert total(items) == spawned
+
+    # Нового типа в мире нет, брошенные в механизм стопки не сливаются - стопки не принимаются,
+    # ничего лежащего при этом не вытесняется
+    assert not items.spawn("uranium_rod", 0, 0, 0, 0, count=7)
+    assert not items.spawn("scrap", 0, 0, 6, 0, thrown=True, count=4)
+    assert len(items) == MAX_DROPPED_ITEMS
+    assert total(items) == spawned
+
+    items.merge()
+    assert total(items) == spawned
+
+
+def test_budget_is_hard_cap():
+    items = DroppedItems()
+    refused = 0
+    for i in range(MAX_DROPPED_ITEMS * 3):
+        kind = f"kind{i % 7}"
+        thrown = i % 5 == 0
+        if not items.spawn(kind, i * ITEM_MERGE_RADIUS * 2, 0, 0, 0, thrown=thrown, count=2): refused += 2
+        assert len(items) <= MAX_DROPPED_ITEMS
+    assert total(items) + refused == 2 * MAX_DROPPED_ITEMS * 3
+
+
+def test_merge_keeps_total():
+    items = DroppedItems()
+    for i in range(100): items.spawn("dust", 1 + i % 3, 1, 0, 0, count=i + 1)
+    items.spawn("dust", 1, 1, 0, 0, thrown=True, count=50)
+    items.merge()
+    assert len(items) == 2
+    assert total(items) == sum(range(1, 101)) + 50
+    assert np.count_nonzero(items.thrown[:len(items)]) == 1
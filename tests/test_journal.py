@@ -0,0 +1,129 @@
+from core.constants import BLOCK_CHEST, CHUNK_SIZE
+from core.journal import EditJournal
+from core.persist import BackgroundWriter
+from core.region import RegionStore, RegionFile, CHUNK_CELLS, cell_index
+
+
+def open_world(path):
+    store = RegionStore(str(path))
+    writer = BackgroundWriter()
+    return store, writer, EditJournal(str(path), writer, store)
+
+
+def snapshot_and_rotate(store, journal, writer, cx=0, grid=bytes(CHUNK_CELLS), meta=None):
+    """То же, что World.save_dirty для одного чанка (cx, 0)"""
+    store.save_later(cx, 0, grid, meta or {})
+    journal.depends_on(writer.submit(store.write_pending, cx, 0))
+    journal.rotate()
+    writer.wait()
+
+
+def crash_and_reload(path, store, writer, journal):
+    """Падение игры: незаписанные снимки пропадают, остается только то, что на диске"""
+    writer.close()
+    journal.close()
+    store.pending.clear()
+    store.failed.clear()
+    store.close()
+    store = RegionStore(str(path))
+    return store, EditJournal(str(path), BackgroundWriter(), store).replay()
+
+
+def break_writes(monkeypatch, chunks):
+    original = RegionFile.write_chunk
+
+    def write_chunk(self, cx, cy, grid, meta):
+        if (cx, cy) in chunks: raise ValueError("сбой записи")
+        original(self, cx, cy, grid, meta)
+    monkeypatch.setattr(RegionFile, "write_chunk", write_chunk)
+
+
+def chest_grid():
+    grid = bytearray(CHUNK_CELLS)
+    grid[cell_index(1, 2)] = BLOCK_CHEST
+    return bytes(grid)
+
+
+def test_segment_kept_when_chunk_write_fails(tmp_path, monkeypatch):
+    store, writer, journal = open_world(tmp_path)
+    journal.block_set(1, 2, BLOCK_CHEST)
+    journal.meta_set(1, 2, {"inv": {"dust": 3}})
+
+    break_writes(monkeypatch, {(0, 0)})
+    snapshot_and_rotate(store, journal, writer, grid=chest_grid(), meta={cell_index(1, 2): {"inv": {"dust": 3}}})
+    assert writer.errors > 0  # Повтор в rotate() может успеть упасть еще раз
+    assert len(journal.segments()) == 1
+    assert (0, 0) in store.pending  # Снимок вернулся в очередь
+    assert store.failed_chunks() == [(0, 0)]
+
+    # Следующий запуск: сегмент проигрывается в регион
+    monkeypatch.undo()
+    store, replayed = crash_and_reload(tmp_path, store, writer, journal)
+    assert replayed == 2
+    grid, meta = store.load(0, 0)
+    assert grid[cell_index(1, 2)] == BLOCK_CHEST
+    assert meta[cell_index(1, 2)] == {"inv": {"dust": 3}}
+    store.close()
+
+
+def test_failed_snapshot_retried_on_next_rotate(tmp_path, monkeypatch):
+    # Сундук поставлен, запись чанка не удалась; сундук убран, следующее сохранение прошло - после падения
+    # старый сегмент не должен вернуть сундук
+    store, writer, journal = open_world(tmp_path)
+    journal.block_set(1, 2, BLOCK_CHEST)
+    break_writes(monkeypatch, {(0, 0)})
+    snapshot_and_rotate(store, journal, writer, grid=chest_grid())
+    monkeypatch.undo()
+
+    journal.block_set(1, 2, 0)
+    snapshot_and_rotate(store, journal, writer)
+    assert store.failed_chunks() == []
+    assert journal.segments() == []
+
+    store, replayed = crash_and_reload(tmp_path, store, writer, journal)
+    assert replayed == 0
+    assert store.load(0, 0)[0][cell_index(1, 2)] == 0
+    store.close()
+
+
+def test_later_segments_kept_while_earlier_kept(tmp_path, monkeypatch):
+    store, writer, journal = open_world(tmp_path)
+    journal.block_set(1, 2, BLOCK_CHEST)
+    break_writes(monkeypatch, {(0, 0)})
+    snapshot_and_rotate(store, journal, writer, grid=chest_grid())
+
+    # Запись другого чанка проходит, но снимок (0, 0) все еще не записан - оба сегмента остаются
+    journal.block_set(1, 2, 0)
+    journal.block_set(CHUNK_SIZE + 1, 2, BLOCK_CHEST)
+    store.save_later(0, 0, bytes(CHUNK_CELLS), {})
+    snapshot_and_rotate(store, journal, writer, cx=1, grid=chest_grid())
+    assert len(journal.segments()) == 2
+    monkeypatch.undo()
+
+    store, replayed = crash_and_reload(tmp_path, store, writer, journal)
+    assert replayed == 3
+    assert store.load(0, 0)[0][cell_index(1, 2)] == 0
+    assert store.load(1, 0)[0][cell_index(1, 2)] == BLOCK_CHEST
+    store.close()
+
+
+def test_segment_removed_after_successful_write(tmp_path):
+    store, writer, journal = open_world(tmp_path)
+    journal.block_set(CHUNK_SIZE + 1, 2, BLOCK_CHEST)
+    snapshot_and_rotate(store, journal, writer, cx=1, grid=chest_grid())
+    assert writer.errors == 0
+    assert journal.segments() == []
+    writer.close()
+    store.close()
+
+
+def test_journal_sync_not_in_save_progress(tmp_path):
+    store, writer, journal = open_world(tmp_path)
+    journal.block_set(1, 2, BLOCK_CHEST)
+    journal.update(1.0)
+    journal.rotate()
+    writer.wait()
+    assert (writer.queued, writer.done) == (0, 0)
+    assert writer.progress() is None
+    writer.close()
+    store.close()